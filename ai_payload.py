@@ -0,0 +1,147 @@
+"""
+AI payload helpers - pure, fully typed functions on the per-tick prompt/response path
+Kept free of bot state so the module can be compiled ahead of time with mypyc:
+
+    mypyc ai_payload.py
+
+The compiled extension shadows this file on import; without it the same code runs interpreted.
+"""
+import json
+from typing import Any, Dict, FrozenSet, List, Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Fields hidden from the AI - it identifies tokens by Symbol, contracts are mapped back later
+HIDDEN_KEYS: FrozenSet[str] = frozenset(('SmartContract', 'contract_address'))
+
+
+def loads(text: str) -> Any:
+    """Deserialize JSON text (orjson when installed)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def to_compact_json(obj: Any) -> str:
+    """
+    Serialize data to compact JSON for AI consumption (no whitespace).
+    One C-level encoder call (orjson when installed) instead of a recursive Python walk.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+def strip_hidden_fields(node: Any, hidden: FrozenSet[str] = HIDDEN_KEYS) -> Any:
+    """
+    Remove hidden (SmartContract) fields from nested dicts/lists.
+    Copy-on-write: containers without hidden keys anywhere below are returned as-is, not copied.
+    """
+    if isinstance(node, dict):
+        changed = False
+        filtered: Dict[Any, Any] = {}
+        for k, v in node.items():
+            # Skip SmartContract fields - AI doesn't need them
+            if k in hidden:
+                changed = True
+                continue
+            # Recursively filter nested objects
+            nv = strip_hidden_fields(v, hidden)
+            if nv is not v:
+                changed = True
+            filtered[k] = nv
+        return filtered if changed else node
+
+    if isinstance(node, list):
+        items: List[Any] = []
+        changed = False
+        for item in node:
+            ni = strip_hidden_fields(item, hidden)
+            if ni is not item:
+                changed = True
+            items.append(ni)
+        return items if changed else node
+
+    return node
+
+
+def build_symbol_index(trade_data: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Map upper-cased symbol -> market entry (contract_address, asset_id, ...) from trade data
+    First occurrence wins, matching the linear scans this replaces.
+    Note: liquidity_events contains OrdersMatched events with asset IDs, not contract addresses,
+    so contract addresses come from trade_data only.
+    """
+    index: Dict[str, Dict[str, Any]] = {}
+    markets = trade_data.get('top_markets', []) if trade_data else []
+    for m in markets:
+        index.setdefault(m.get('symbol', '').upper(), m)
+    return index
+
+
+class ActionStreamParser:
+    """
+    Incrementally pull complete top-level objects out of a streamed JSON array ('[{...}, {...}]'),
+    so each action is parsed as soon as its closing brace arrives instead of after the whole response.
+    Anything before the first '[' (prose, code fences) is skipped.
+    """
+
+    def __init__(self) -> None:
+        self.elements: List[Any] = []
+        self.closed = False  # Top-level array fully received
+        self.failed = False  # An element didn't parse - caller falls back to the full text
+        # Text of the element in progress, one slice per chunk - joined only when it closes, so a long
+        # response is scanned once and never re-copied delta by delta
+        self._parts: List[str] = []
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+
+    def feed(self, text: str) -> None:
+        """Scan a newly received chunk, parsing any elements it completes"""
+        i, n = 0, len(text)
+        depth, in_str, escape = self._depth, self._in_str, self._escape
+        parts = self._parts
+        # Where the element in progress starts in this chunk: 0 if it began in an earlier one, -1 outside any
+        elem_start = 0 if parts else -1
+
+        while i < n and not (self.closed or self.failed):
+            c = text[i]
+            if in_str:
+                if escape:
+                    escape = False
+                elif c == '\\':
+                    escape = True
+                elif c == '"':
+                    in_str = False
+            elif depth == 0:
+                if c == '[':
+                    depth = 1
+            elif c == '"':
+                in_str = True
+            elif c == '{' or c == '[':
+                if depth == 1:
+                    elem_start = i
+                depth += 1
+            elif c == '}' or c == ']':
+                depth -= 1
+                if depth == 0:
+                    self.closed = True
+                elif depth == 1 and elem_start >= 0:
+                    parts.append(text[elem_start:i + 1])
+                    try:
+                        self.elements.append(loads(''.join(parts)))
+                    except ValueError:
+                        self.failed = True
+                    parts.clear()
+                    elem_start = -1
+            i += 1
+
+        if elem_start >= 0 and not (self.closed or self.failed):
+            parts.append(text[elem_start:])  # Element continues in the next chunk
+        self._depth, self._in_str, self._escape = depth, in_str, escape
@@ -0,0 +1,156 @@
+"""
+Bitquery GraphQL client - the shared HTTP session (keep-alive, retries, gzip) and request helper
+used by both fetchers (market_data for DEX trades, liquidity_data for OrdersMatched events)
+"""
+import os
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    import json
+    ORJSON_AVAILABLE = False
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+
+log = logging.getLogger(__name__)
+
+BITQUERY_API_KEY = os.getenv('BITQUERY_API_KEY')
+
+BITQUERY_URL = "https://streaming.bitquery.io/graphql"
+
+
+def dumps(obj) -> bytes:
+    """Serialize to compact JSON bytes (orjson when installed)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data: bytes):
+    """Deserialize JSON bytes (orjson when installed)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Shared HTTP session - keep-alive reuses the TLS connection to Bitquery across polls
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(['POST']),  # GraphQL queries are read-only, safe to retry
+        raise_on_status=False  # Hand the final response back so the status check below reports it
+    )
+))
+_SESSION.headers.update({
+    'Content-Type': 'application/json',
+    'Accept-Encoding': 'gzip, deflate',  # Responses are tens of KB of JSON; requests decompresses transparently
+    'Authorization': f'Bearer {BITQUERY_API_KEY}'
+})
+
+
+def _watch_errors(events: Iterable[tuple], errors: List[str]) -> Iterator[tuple]:
+    """Pass ijson parse events through unchanged, collecting the message of each entry in the response's errors array"""
+    for prefix, event, value in events:
+        if prefix == 'errors.item':
+            if event == 'start_map':
+                errors.append('Unknown error')
+        elif prefix == 'errors.item.message' and errors:
+            errors[-1] = value
+        yield prefix, event, value
+
+
+def _collect_items(items: Iterable[Dict],
+                   parse: Optional[Callable[[Dict], Optional[Dict]]]) -> Tuple[int, List[Dict]]:
+    """Run items through parse (dropping Nones) - returns (number of raw items seen, kept items)"""
+    if parse is None:
+        result = list(items)
+        return len(result), result
+    count = 0
+    result = []
+    for item in items:
+        count += 1
+        parsed = parse(item)
+        if parsed is not None:
+            result.append(parsed)
+    return count, result
+
+
+def graphql_post(body: bytes, items_path: str, label: str,
+                 parse: Optional[Callable[[Dict], Optional[Dict]]] = None) -> Optional[List[Dict]]:
+    """
+    POST an encoded GraphQL body to Bitquery over the shared session and return the list at items_path
+
+    Args:
+        body: Encoded request body ({"query": ..., "variables": ...})
+        items_path: Dotted path to the result array, e.g. 'data.EVM.Events'
+        label: Name of the result set used in log messages
+        parse: Optional per-item parser - items it returns None for are dropped
+
+    Returns:
+        List of (parsed) items, or None on HTTP/API errors or when nothing is left
+    """
+    try:
+        # With ijson the body is streamed and parsed incrementally instead of being loaded whole
+        with _SESSION.post(BITQUERY_URL, data=body, timeout=10, stream=IJSON_AVAILABLE) as response:
+
+            if response.status_code != 200:
+                log.error("❌ Bitquery API error: %s", response.status_code)
+                return None
+
+            if IJSON_AVAILABLE:
+                # Each item is parsed as its bytes arrive, so only one raw item is held at a time
+                response.raw.decode_content = True  # Let urllib3 undo gzip before ijson sees it
+                # The errors envelope is read off the same event stream, wherever it appears in the document
+                errors: List[str] = []
+                events = _watch_errors(ijson.parse(response.raw), errors)
+                count, result = _collect_items(ijson.items(events, items_path + '.item'), parse)
+
+                # Check for API errors
+                if errors:
+                    log.warning("⚠️  %s API not available: %s", label, errors[0])
+                    return None
+
+                if not count:
+                    log.warning("⚠️  No %s returned", label)
+                    return None
+            else:
+                data = loads(response.content)
+
+                # Check for API errors
+                if 'errors' in data:
+                    log.warning("⚠️  %s API not available: %s", label, data['errors'][0].get('message', 'Unknown error'))
+                    return None
+
+                items = data
+                for part in items_path.split('.'):
+                    items = (items or {}).get(part)
+
+                if not items:
+                    log.warning("⚠️  No %s returned", label)
+                    return None
+
+                _, result = _collect_items(items, parse)
+
+        if not result:
+            log.warning("⚠️  No valid %s processed", label)
+            return None
+
+        return result
+
+    except Exception as e:
+        log.warning("⚠️  Error fetching %s: %s", label, e)
+        return None
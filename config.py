@@ -2,9 +2,20 @@
 DEX Configuration for Polygon (Matic) Chain
 Uniswap V3 Router and common token addresses for Polymarket trading
 """
+from types import MappingProxyType
+
+
+def _freeze(obj):
+    """Recursively convert dicts to read-only mappings and lists to tuples"""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
 
 # Polygon Mainnet (Chain ID: 137)
-POLYGON_MAINNET = {
+POLYGON_MAINNET = _freeze({
     "chain_id": 137,
     "rpc_url": "https://polygon-rpc.com",
 
@@ -21,13 +32,19 @@ POLYGON_MAINNET = {
         "DAI": "0x8f3Cf7ad23Cd3CaDbD9735AFf958023239c6A063",  # DAI on Polygon
         "MATIC": "0x0000000000000000000000000000000000001010",  # Native MATIC (not ERC20, but included for reference)
     }
-}
+})
+
+# Token addresses normalized once at import. The addresses above are stored in
+# EIP-55 checksum form; the lowercase map is for comparing against API data
+# (e.g. Bitquery SmartContract fields), which is lowercase.
+TOKEN_ADDRS_CHECKSUM = POLYGON_MAINNET["tokens"]
+TOKEN_ADDRS_LOWER = MappingProxyType({k: v.lower() for k, v in TOKEN_ADDRS_CHECKSUM.items()})
 
 # Alias for backward compatibility
 BASE_MAINNET = POLYGON_MAINNET
 
 # Uniswap V3 SwapRouter02 ABI (minimal)
-SWAPROUTER_ABI = [
+SWAPROUTER_ABI = _freeze([
     {
         "inputs": [
             {
@@ -50,10 +67,10 @@ SWAPROUTER_ABI = [
         "stateMutability": "payable",
         "type": "function"
     }
-]
+])
 
 # ERC20 ABI (minimal)
-ERC20_ABI = [
+ERC20_ABI = _freeze([
     {
         "constant": True,
         "inputs": [{"name": "_owner", "type": "address"}],
@@ -95,11 +112,51 @@ ERC20_ABI = [
         "outputs": [{"name": "", "type": "string"}],
         "type": "function"
     }
-]
+])
 
 # Fee tiers for Uniswap V3 (in basis points)
-FEE_TIERS = {
+FEE_TIERS = MappingProxyType({
     "LOW": 500,      # 0.05%
     "MEDIUM": 3000,  # 0.3%
     "HIGH": 10000    # 1%
-}
+})
+
+# 4-byte selector of exactInputSingle((address,address,uint24,address,uint256,uint256,uint160)),
+# i.e. keccak256(signature)[:4] - lets calldata encoders skip the ABI lookup on the swap path
+EXACT_INPUT_SINGLE_SELECTOR = bytes.fromhex("04e45aaf")
+
+
+def _thaw(obj):
+    """Inverse of _freeze - plain dicts/lists in the shape web3 expects"""
+    if isinstance(obj, MappingProxyType):
+        return {k: _thaw(v) for k, v in obj.items()}
+    if isinstance(obj, tuple):
+        return [_thaw(v) for v in obj]
+    return obj
+
+
+_SWAPROUTER_ABI_LIST = _thaw(SWAPROUTER_ABI)
+_ERC20_ABI_LIST = _thaw(ERC20_ABI)
+
+# Built contract objects keyed by (id(w3), address). The Web3 instance is kept in the
+# entry so its id cannot be reused by another instance while cached.
+_CONTRACT_CACHE = {}
+
+
+def _cached_contract(w3, address: str, abi: list):
+    """Build a web3 contract once per (Web3 instance, address)"""
+    key = (id(w3), address)
+    entry = _CONTRACT_CACHE.get(key)
+    if entry is None or entry[0] is not w3:
+        entry = _CONTRACT_CACHE[key] = (w3, w3.eth.contract(address=address, abi=abi))
+    return entry[1]
+
+
+def build_router(w3):
+    """SwapRouter02 contract for w3, parsed once per process"""
+    return _cached_contract(w3, POLYGON_MAINNET["router_v3"], _SWAPROUTER_ABI_LIST)
+
+
+def build_erc20(w3, token_address: str):
+    """ERC20 contract at token_address (checksum form) for w3, parsed once per process"""
+    return _cached_contract(w3, token_address, _ERC20_ABI_LIST)
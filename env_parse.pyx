@@ -0,0 +1,48 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled .env parser - optional fast path for main.py
+Build in place with: cythonize -i env_parse.pyx
+(main.py falls back to its pure-Python parser when this isn't built)
+"""
+from libc.string cimport memchr
+
+
+cdef inline bint _is_space(unsigned char c):
+    # Same set as bytes.strip(): space, \t, \n, \v, \f, \r
+    return c == 32 or 9 <= c <= 13
+
+
+def parse(bytes buf):
+    """Parse .env bytes into {key: value} - same rules as main._parse_env"""
+    cdef const unsigned char* p = buf
+    cdef Py_ssize_t n = len(buf)
+    cdef Py_ssize_t start = 0, end, ks, ke, vs, ve
+    cdef const unsigned char* hit
+    cdef dict out = {}
+
+    while start < n:
+        hit = <const unsigned char*>memchr(p + start, b'\n', n - start)
+        end = hit - p if hit != NULL else n
+
+        hit = <const unsigned char*>memchr(p + start, b'=', end - start)
+        if hit != NULL:
+            # Trim whitespace around the key and value by index - no intermediate strings
+            ks = start
+            ke = hit - p
+            while ks < ke and _is_space(p[ks]):
+                ks += 1
+            while ke > ks and _is_space(p[ke - 1]):
+                ke -= 1
+
+            if ke > ks and p[ks] != b'#':
+                vs = hit - p + 1
+                ve = end
+                while vs < ve and _is_space(p[vs]):
+                    vs += 1
+                while ve > vs and _is_space(p[ve - 1]):
+                    ve -= 1
+                out[buf[ks:ke].decode('utf-8')] = buf[vs:ve].decode('utf-8')
+
+        start = end + 1
+
+    return out
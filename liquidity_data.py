@@ -3,14 +3,96 @@ Liquidity Data Fetcher - Enhanced market data using Bitquery liquidity streams
 This provides much richer data for AI-powered trading decisions
 """
 import os
-import requests
+import sys
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, List, Optional
 
+from bitquery_client import dumps, graphql_post
 
-BITQUERY_API_KEY = os.getenv('BITQUERY_API_KEY')
 
+log = logging.getLogger(__name__)
 
-def fetch_liquidity_events(limit: int = 200) -> List[Dict]:
+ORDERS_MATCHED_QUERY = """
+query PolymarketOrdersMatched($limit: Int!) {
+  EVM(dataset: realtime, network: matic) {
+    Events(
+      orderBy: { descending: Block_Time }
+      where: {
+        Block: {Date: {after_relative: {days_ago: 1}}}
+        Log: { Signature: { Name: { in: ["OrdersMatched"] } } }
+        LogHeader: {
+          Address: { is: "0xC5d563A36AE78145C45a50134d48A1215220f80a" }
+        }
+      }
+      limit: { count: $limit }
+    ) {
+      Block {
+        Time
+      }
+      Arguments {
+        Name
+        Value {
+          ... on EVM_ABI_Integer_Value_Arg {
+            integer
+          }
+          ... on EVM_ABI_Address_Value_Arg {
+            address
+          }
+          ... on EVM_ABI_String_Value_Arg {
+            string
+          }
+          ... on EVM_ABI_BigInt_Value_Arg {
+            bigInteger
+          }
+          ... on EVM_ABI_Bytes_Value_Arg {
+            hex
+          }
+          ... on EVM_ABI_Boolean_Value_Arg {
+            bool
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+
+@functools.lru_cache(maxsize=8)
+def _orders_matched_body(limit: int) -> bytes:
+    """Encoded request body - the query is constant, so this only varies (and is cached) by limit"""
+    return dumps({'query': ORDERS_MATCHED_QUERY, 'variables': {'limit': limit}})
+
+# Value keys of the EVM_ABI_*_Value_Arg fragments, in lookup priority order
+_ARG_KEYS = ('bigInteger', 'address', 'integer', 'string', 'hex', 'bool')
+
+# Bitquery returns the same value type for a given argument name - remember which key holds it
+_ARG_TYPE_CACHE: Dict[str, str] = {}
+
+# Value types holding addresses/ids/hex - the same strings repeat across events and polls
+_INTERN_KEYS = frozenset(('address', 'string', 'hex'))
+
+# Argument names consumed downstream, interned so their dict lookups compare by identity
+_ARG_NAMES = frozenset(map(sys.intern, (
+    'takerOrderMaker', 'takerAssetId', 'takerAmountFilled', 'makerAmountFilled'
+)))
+
+# OrdersMatched over the last 24h changes slowly relative to the poll interval -
+# reuse the last parsed result for LIQUIDITY_TTL seconds (keyed by limit)
+_TTL = float(os.getenv('LIQUIDITY_TTL', '15'))
+_CACHE: Dict[int, tuple] = {}
+
+# In-flight fetches keyed by limit, so a burst of callers shares one HTTP request
+_INFLIGHT: Dict[int, Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+
+def fetch_orders_matched(limit: int = 200) -> List[Dict]:
     """
     Fetch OrdersMatched events from Polymarket order book
     This shows liquidity provision activity - when orders are matched on the order book
@@ -22,137 +104,89 @@ def fetch_liquidity_events(limit: int = 200) -> List[Dict]:
         - takerAmountFilled: Amount of tokens trader wants to buy
         - makerAmountFilled: Amount of tokens liquidity provider can provide
     """
-    url = "https://streaming.bitquery.io/graphql"
-
-    query = """
-    query PolymarketOrdersMatched {
-      EVM(dataset: realtime, network: matic) {
-        Events(
-          orderBy: { descending: Block_Time }
-          where: {
-            Block: {Date: {after_relative: {days_ago: 1}}}
-            Log: { Signature: { Name: { in: ["OrdersMatched"] } } }
-            LogHeader: {
-              Address: { is: "0xC5d563A36AE78145C45a50134d48A1215220f80a" }
-            }
-          }
-          limit: { count: 200 }
-        ) {
-          Block {
-            Time
-          }
-          Arguments {
-            Name
-            Value {
-              ... on EVM_ABI_Integer_Value_Arg {
-                integer
-              }
-              ... on EVM_ABI_Address_Value_Arg {
-                address
-              }
-              ... on EVM_ABI_String_Value_Arg {
-                string
-              }
-              ... on EVM_ABI_BigInt_Value_Arg {
-                bigInteger
-              }
-              ... on EVM_ABI_Bytes_Value_Arg {
-                hex
-              }
-              ... on EVM_ABI_Boolean_Value_Arg {
-                bool
-              }
-            }
-          }
-        }
-      }
-    }
-    """
+    cached = _CACHE.get(limit)
+    if cached is not None and time.monotonic() - cached[0] < _TTL:
+        return cached[1]
+
+    # Single-flight: concurrent callers wait on the in-flight request instead of issuing their own
+    with _INFLIGHT_LOCK:
+        cached = _CACHE.get(limit)
+        if cached is not None and time.monotonic() - cached[0] < _TTL:
+            return cached[1]
+        future = _INFLIGHT.get(limit)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _INFLIGHT[limit] = future
+
+    if not is_owner:
+        return future.result()
 
     try:
-        response = requests.post(
-            url,
-            json={
-                'query': query
-            },
-            headers={
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {BITQUERY_API_KEY}'
-            },
-            timeout=10
-        )
-
-        if response.status_code != 200:
-            print(f"❌ Bitquery API error: {response.status_code}")
-            return None
-
-        data = response.json()
-
-        # Check for API errors
-        if 'errors' in data:
-            print(f"⚠️  OrdersMatched API not available: {data['errors'][0].get('message', 'Unknown error')}")
-            return None
-
-        if not data.get('data'):
-            print("⚠️  No liquidity data returned")
-            return None
-
-        events = data.get('data', {}).get('EVM', {}).get('Events', [])
-
-        if not events:
-            print("⚠️  No OrdersMatched events returned")
-            return None
-
-        # Process events to extract relevant fields from Arguments
-        processed_events = []
-        for event in events:
-            try:
-                # Extract arguments into a dictionary
-                args = {}
-                for arg in event.get('Arguments', []):
-                    arg_name = arg.get('Name')
-                    arg_value = arg.get('Value', {})
-                    
-                    # Extract value based on type
-                    if 'bigInteger' in arg_value:
-                        args[arg_name] = arg_value['bigInteger']
-                    elif 'address' in arg_value:
-                        args[arg_name] = arg_value['address']
-                    elif 'integer' in arg_value:
-                        args[arg_name] = arg_value['integer']
-                    elif 'string' in arg_value:
-                        args[arg_name] = arg_value['string']
-                    elif 'hex' in arg_value:
-                        args[arg_name] = arg_value['hex']
-                    elif 'bool' in arg_value:
-                        args[arg_name] = arg_value['bool']
-                
-                # Build processed event
-                processed_event = {
-                    'timestamp': event.get('Block', {}).get('Time'),
-                    'takerOrderMaker': args.get('takerOrderMaker'),  # Trader address
-                    'takerAssetId': args.get('takerAssetId'),  # Asset ID
-                    'takerAmountFilled': args.get('takerAmountFilled'),  # Amount trader wants to buy
-                    'makerAmountFilled': args.get('makerAmountFilled'),  # Amount liquidity provider can provide
-                    'takerOrderHash': args.get('takerOrderHash'),  # Order hash for reference
-                    'makerAssetId': args.get('makerAssetId')  # Maker asset ID
-                }
-                
-                processed_events.append(processed_event)
-            except Exception as e:
-                # Skip events that can't be processed
+        result = graphql_post(_orders_matched_body(limit), 'data.EVM.Events', 'OrdersMatched events', _parse_event)
+        if result is not None:
+            _CACHE[limit] = (time.monotonic(), result)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _INFLIGHT_LOCK:
+            _INFLIGHT.pop(limit, None)
+
+
+# Existing name used by callers - OrdersMatched is this bot's liquidity signal
+fetch_liquidity_events = fetch_orders_matched
+
+
+def _parse_arguments(arguments: List[Dict], names: frozenset, _keys=_ARG_KEYS, _type_cache=_ARG_TYPE_CACHE,
+                     _intern_keys=_INTERN_KEYS, _intern=sys.intern) -> Dict:
+    """Flatten a Bitquery Arguments list into {name: value}, keeping only the given argument names"""
+    args = {}
+    for arg in arguments:
+        if not isinstance(arg, dict):
+            continue
+        arg_name = arg.get('Name')
+        if arg_name not in names:
+            continue  # Only the requested fields are kept - skip the rest entirely
+        arg_value = arg.get('Value') or {}
+
+        # Extract value based on type - one probe once the argument's type is known
+        key = _type_cache.get(arg_name)
+        if key is None or key not in arg_value:
+            key = next((k for k in _keys if k in arg_value), None)
+            if key is None:
                 continue
+            _type_cache[arg_name] = key
+        value = arg_value[key]
+        if key in _intern_keys and isinstance(value, str):
+            value = _intern(value)  # Repeated addresses/ids share one object; equality checks hit the identity fast path
+        args[arg_name] = value
+    return args
 
-        if not processed_events:
-            print("⚠️  No valid OrdersMatched events processed")
-            return None
-
-        return processed_events
 
-    except Exception as e:
-        print(f"⚠️  Error fetching OrdersMatched events: {e}")
+def _parse_event(event: Dict) -> Optional[Dict]:
+    """
+    Flatten one OrdersMatched event's Arguments into a processed event dict
+    Returns None for malformed events instead of raising
+    """
+    if not isinstance(event, dict):
+        return None
+    arguments = event.get('Arguments')
+    if not arguments:
         return None
 
+    # Extract arguments into a dictionary
+    args_get = _parse_arguments(arguments, _ARG_NAMES).get
+    return {
+        'timestamp': (event.get('Block') or {}).get('Time'),
+        'takerOrderMaker': args_get('takerOrderMaker'),  # Trader address
+        'takerAssetId': args_get('takerAssetId'),  # Asset ID
+        'takerAmountFilled': args_get('takerAmountFilled'),  # Amount trader wants to buy
+        'makerAmountFilled': args_get('makerAmountFilled')  # Amount liquidity provider can provide
+    }
+
 
 def get_enhanced_market_data() -> Dict:
     """
@@ -162,13 +196,19 @@ def get_enhanced_market_data() -> Dict:
     """
     from market_data import fetch_polymarket_data
 
-    # Get regular trade data (Polymarket on Polygon)
-    print("📡 Fetching trade data...")
-    trade_data = fetch_polymarket_data(limit=200)
+    # Both requests are independent - run them in parallel so a refresh costs
+    # max(t_trade, t_liquidity) instead of the sum (requests releases the GIL on socket I/O)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # Get regular trade data (Polymarket on Polygon)
+        log.debug("📡 Fetching trade data...")
+        trade_future = executor.submit(fetch_polymarket_data, limit=200)
+
+        # Get liquidity events
+        log.debug("💧 Fetching liquidity events...")
+        liquidity_future = executor.submit(fetch_orders_matched)
 
-    # Get liquidity events
-    print("💧 Fetching liquidity events...")
-    liquidity_data = fetch_liquidity_events()
+        trade_data = trade_future.result()
+        liquidity_data = liquidity_future.result()
 
     # Return raw responses - no processing, no combining
     return {
@@ -178,6 +218,7 @@ def get_enhanced_market_data() -> Dict:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s", stream=sys.stdout)
     print("🔍 Testing Enhanced Market Data Fetcher...")
     data = get_enhanced_market_data()
 
@@ -1,11 +1,18 @@
 """
-Logging module for trading bot - exports data to Excel files
+Logging module for trading bot - exports data to Excel files (or append-only CSV via LOG_FORMAT=csv)
 """
 import os
-from datetime import datetime
+import csv
+import logging
+import atexit
+import functools
+import threading
+from datetime import date, datetime
 from typing import Dict, List, Optional
 from pathlib import Path
 
+log = logging.getLogger(__name__)
+
 try:
     import openpyxl
     from openpyxl import Workbook, load_workbook
@@ -13,23 +20,49 @@ try:
     OPENPYXL_AVAILABLE = True
 except ImportError:
     OPENPYXL_AVAILABLE = False
-    print("⚠️  openpyxl not installed. Install with: pip install openpyxl")
+    log.warning("⚠️  openpyxl not installed. Install with: pip install openpyxl")
+
+# Storage format: "xlsx" (default, human-friendly) or "csv" (append-only, O(1) per row)
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'xlsx').strip().lower()
+if LOG_FORMAT not in ('xlsx', 'csv'):
+    log.warning("⚠️  Unknown LOG_FORMAT '%s', falling back to xlsx", LOG_FORMAT)
+    LOG_FORMAT = 'xlsx'
+LOGGING_AVAILABLE = LOG_FORMAT == 'csv' or OPENPYXL_AVAILABLE
+
+# Open workbooks and worksheets, kept across log calls so each file is parsed once per process.
+# Rows are written in memory and the workbooks marked dirty; flush_logs() saves them.
+_WB_CACHE: Dict[Path, "Workbook"] = {}
+_WS_CACHE: Dict[tuple, object] = {}
+_DIRTY: set = set()
+# Guards the caches above and the files - log calls may come from more than one thread
+_LOCK = threading.RLock()
 
 
+@functools.lru_cache(maxsize=1)
 def get_logs_directory() -> Path:
-    """Get or create logs directory"""
-    logs_dir = Path("logs")
+    """Get or create logs directory (created once per process)"""
+    logs_dir = Path(__file__).parent.absolute() / "logs"  # Next to the bot, independent of the launch directory
     logs_dir.mkdir(exist_ok=True)
     return logs_dir
 
 
-def get_log_filename(prefix: str = "trading_log") -> str:
-    """Generate log filename with date"""
-    date_str = datetime.now().strftime("%Y%m%d")
-    return f"{prefix}_{date_str}.xlsx"
+_FILENAME_CACHE: Dict[tuple, str] = {}
+
+
+def get_log_filename(prefix: str = "trading_log", extension: str = "xlsx") -> str:
+    """Generate log filename with date (cached per day)"""
+    key = (prefix, extension, date.today())
+    filename = _FILENAME_CACHE.get(key)
+    if filename is None:
+        # Keyed on today's date, so the cache rolls over at midnight by itself
+        if len(_FILENAME_CACHE) > 64:
+            _FILENAME_CACHE.clear()
+        date_str = key[2].strftime("%Y%m%d")
+        filename = _FILENAME_CACHE[key] = f"{prefix}_{date_str}.{extension}"
+    return filename
 
 
-def create_workbook_if_not_exists(filepath: Path) -> Workbook:
+def create_workbook_if_not_exists(filepath: Path) -> "Workbook":
     """Create a new workbook or load existing one"""
     if filepath.exists():
         return load_workbook(filepath)
@@ -41,7 +74,7 @@ def create_workbook_if_not_exists(filepath: Path) -> Workbook:
         return wb
 
 
-def ensure_sheet_exists(wb: Workbook, sheet_name: str, headers: List[str]):
+def ensure_sheet_exists(wb: "Workbook", sheet_name: str, headers: List[str]):
     """Ensure sheet exists with headers"""
     if sheet_name not in wb.sheetnames:
         ws = wb.create_sheet(sheet_name)
@@ -57,8 +90,118 @@ def ensure_sheet_exists(wb: Workbook, sheet_name: str, headers: List[str]):
     return wb[sheet_name]
 
 
+def _append_rows(prefix: str, sheet_name: str, headers: List[str], rows: List[List]) -> Path:
+    """
+    Append rows to the day's log file for prefix in the configured LOG_FORMAT
+    
+    CSV files are opened in append mode, so each call only costs the rows written.
+    XLSX workbooks are cached in memory and saved by flush_logs().
+    
+    Returns:
+        Path of the file written
+    """
+    with _LOCK:
+        logs_dir = get_logs_directory()
+    
+        if LOG_FORMAT == 'csv':
+            filepath = logs_dir / get_log_filename(prefix, "csv")
+            write_header = not filepath.exists()
+            with open(filepath, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if write_header:
+                    writer.writerow(headers)
+                writer.writerows(rows)
+            return filepath
+    
+        filepath = logs_dir / get_log_filename(prefix)
+        ws = _get_ws(filepath, sheet_name, headers)
+    
+        # Worksheet.append writes the whole row after the last used one
+        for row_data in rows:
+            ws.append(row_data)
+    
+        # Saved by flush_logs() - once per tick instead of once per call
+        _DIRTY.add(filepath)
+        return filepath
+
+
+def _get_wb(filepath: Path) -> "Workbook":
+    """Load a workbook once and reuse it for later log calls"""
+    wb = _WB_CACHE.get(filepath)
+    if wb is None:
+        wb = create_workbook_if_not_exists(filepath)
+        _WB_CACHE[filepath] = wb
+    return wb
+
+
+def _get_ws(filepath: Path, sheet_name: str, headers: List[str]):
+    """Get (creating if needed) a worksheet of a cached workbook"""
+    key = (filepath, sheet_name)
+    ws = _WS_CACHE.get(key)
+    if ws is None:
+        ws = ensure_sheet_exists(_get_wb(filepath), sheet_name, headers)
+        _WS_CACHE[key] = ws
+    return ws
+
+
+def flush_logs() -> None:
+    """
+    Save every cached workbook that has unsaved rows
+    
+    Call at the end of each trading cycle; also registered with atexit.
+    Workbooks from previous days are dropped from the cache once saved.
+    """
+    with _LOCK:
+        for filepath in list(_DIRTY):
+            try:
+                _WB_CACHE[filepath].save(filepath)
+                _DIRTY.discard(filepath)
+            except Exception as e:
+                log.error("❌ Error saving %s: %s", filepath, e)
+    
+        date_str = datetime.now().strftime("%Y%m%d")
+        for filepath in list(_WB_CACHE):
+            if date_str not in filepath.name and filepath not in _DIRTY:
+                del _WB_CACHE[filepath]
+                for key in [k for k in _WS_CACHE if k[0] == filepath]:
+                    del _WS_CACHE[key]
+
+
+atexit.register(flush_logs)
+
+
+def _requires_log_backend(func):
+    """
+    Replace a log function with a no-op at import time when no storage backend
+    is usable (xlsx format without openpyxl), so call sites pay no per-call check
+    """
+    if LOGGING_AVAILABLE:
+        return func
+    
+    @functools.wraps(func)
+    def _disabled(*args, **kwargs):
+        return None
+    return _disabled
+
+
+def _now_str() -> str:
+    """Current local time in the log timestamp format"""
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+@functools.lru_cache(maxsize=1024)
+def _fmt_iso(ts: str) -> Optional[str]:
+    """Reformat an ISO timestamp for the logs; None if it can't be parsed"""
+    try:
+        dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+@_requires_log_backend
 def log_open_positions(open_positions: List[Dict], market_data: Optional[Dict] = None, 
-                       pnl_data: Optional[Dict] = None) -> Optional[str]:
+                       pnl_data: Optional[Dict] = None, timestamp: Optional[str] = None) -> Optional[str]:
     """
     Log open positions to Excel file
     
@@ -66,54 +209,47 @@ def log_open_positions(open_positions: List[Dict], market_data: Optional[Dict] =
         open_positions: List of open position dictionaries
         market_data: Optional market data for current prices
         pnl_data: Optional pre-calculated PnL data
+        timestamp: Optional timestamp string shared by all rows
     
     Returns:
         Filepath of created log file, or None if failed
     """
-    if not OPENPYXL_AVAILABLE:
+    if not open_positions:
         return None
     
     try:
-        logs_dir = get_logs_directory()
-        filepath = logs_dir / get_log_filename("open_positions")
-        wb = create_workbook_if_not_exists(filepath)
-        
         headers = [
             "Timestamp", "Position ID", "Market", "Asset ID", "Action", "Entry Price", 
             "Current Price", "Target Price", "Stop Loss", "Amount USD",
             "PnL USD", "PnL %", "Confidence", "Reasoning"
         ]
         
-        ws = ensure_sheet_exists(wb, "Open Positions", headers)
+        rows = []
         
-        # Find next empty row
-        next_row = ws.max_row + 1
+        if timestamp is None:
+            timestamp = _now_str()
         
-        # Get current timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # Index PnL entries by market once (first entry wins, as with a linear scan)
+        pnl_by_market = {}
+        for pnl_pos in (pnl_data or {}).get('positions') or []:
+            pnl_by_market.setdefault(pnl_pos.get('market'), pnl_pos)
         
         # Log each position
         for position in open_positions:
             position_id = position.get('id', position.get('market', 'N/A'))
             market = position.get('market', position.get('token_out', 'N/A'))
             entry_price = position.get('entry_price', 0)
-            current_price = entry_price  # Default to entry if not available
             
-            # Try to get current price from pnl_data
-            if pnl_data and pnl_data.get('positions'):
-                for pnl_pos in pnl_data['positions']:
-                    if pnl_pos.get('market') == market:
-                        current_price = pnl_pos.get('current_price', entry_price)
-                        break
-            
-            pnl_usd = 0
-            pnl_pct = 0
-            if pnl_data and pnl_data.get('positions'):
-                for pnl_pos in pnl_data['positions']:
-                    if pnl_pos.get('market') == market:
-                        pnl_usd = pnl_pos.get('pnl_usd', 0)
-                        pnl_pct = pnl_pos.get('pnl_pct', 0)
-                        break
+            # Current price and PnL from pnl_data, defaulting to entry price / zero
+            pnl_pos = pnl_by_market.get(market)
+            if pnl_pos is not None:
+                current_price = pnl_pos.get('current_price', entry_price)
+                pnl_usd = pnl_pos.get('pnl_usd', 0)
+                pnl_pct = pnl_pos.get('pnl_pct', 0)
+            else:
+                current_price = entry_price
+                pnl_usd = 0
+                pnl_pct = 0
             
             row_data = [
                 timestamp,
@@ -132,61 +268,54 @@ def log_open_positions(open_positions: List[Dict], market_data: Optional[Dict] =
                 position.get('reasoning', '')[:100]  # Truncate long reasoning
             ]
             
-            for col_idx, value in enumerate(row_data, start=1):
-                ws.cell(row=next_row, column=col_idx, value=value)
-            
-            next_row += 1
+            rows.append(row_data)
         
-        wb.save(filepath)
+        filepath = _append_rows("open_positions", "Open Positions", headers, rows)
         return str(filepath)
         
     except Exception as e:
-        print(f"❌ Error logging open positions: {e}")
+        log.error("❌ Error logging open positions: %s", e)
         return None
 
 
-def log_closed_positions(closed_positions: List[Dict]) -> Optional[str]:
+@_requires_log_backend
+def log_closed_positions(closed_positions: List[Dict], timestamp: Optional[str] = None) -> Optional[str]:
     """
     Log closed positions to Excel file
     
     Args:
         closed_positions: List of closed position dictionaries
+        timestamp: Optional fallback timestamp for positions without a parseable close time
     
     Returns:
         Filepath of created log file, or None if failed
     """
-    if not OPENPYXL_AVAILABLE:
+    if not closed_positions:
         return None
     
     try:
-        logs_dir = get_logs_directory()
-        filepath = logs_dir / get_log_filename("closed_positions")
-        wb = create_workbook_if_not_exists(filepath)
-        
         headers = [
             "Timestamp", "Position ID", "Market", "Asset ID", "Action", "Entry Price",
             "Exit Price", "Target Price", "Stop Loss", "Amount USD",
             "PnL USD", "PnL %", "Close Reason", "Confidence", "Reasoning"
         ]
         
-        ws = ensure_sheet_exists(wb, "Closed Positions", headers)
+        if timestamp is None:
+            timestamp = _now_str()
         
-        # Find next empty row
-        next_row = ws.max_row + 1
+        rows = []
         
         # Log each closed position
         for position in closed_positions:
-            timestamp = position.get('closed_at', position.get('timestamp', datetime.now().isoformat()))
-            if isinstance(timestamp, str):
-                try:
-                    # Try to parse ISO format
-                    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
-                except:
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            row_timestamp = position.get('closed_at', position.get('timestamp'))
+            if isinstance(row_timestamp, str):
+                # Try to parse ISO format
+                row_timestamp = _fmt_iso(row_timestamp)
+            if row_timestamp is None:
+                row_timestamp = timestamp
             
             row_data = [
-                timestamp,
+                row_timestamp,
                 position.get('id', position.get('market', 'N/A')),
                 position.get('market', position.get('token_out', 'N/A')),
                 position.get('asset_id', 'N/A'),  # Asset ID
@@ -203,19 +332,17 @@ def log_closed_positions(closed_positions: List[Dict]) -> Optional[str]:
                 position.get('reasoning', '')[:100]  # Truncate long reasoning
             ]
             
-            for col_idx, value in enumerate(row_data, start=1):
-                ws.cell(row=next_row, column=col_idx, value=value)
-            
-            next_row += 1
+            rows.append(row_data)
         
-        wb.save(filepath)
+        filepath = _append_rows("closed_positions", "Closed Positions", headers, rows)
         return str(filepath)
         
     except Exception as e:
-        print(f"❌ Error logging closed positions: {e}")
+        log.error("❌ Error logging closed positions: %s", e)
         return None
 
 
+@_requires_log_backend
 def log_pnl_report(pnl_data: Dict, daily_pnl: float, timestamp: Optional[str] = None) -> Optional[str]:
     """
     Log PnL report to Excel file
@@ -228,26 +355,14 @@ def log_pnl_report(pnl_data: Dict, daily_pnl: float, timestamp: Optional[str] =
     Returns:
         Filepath of created log file, or None if failed
     """
-    if not OPENPYXL_AVAILABLE:
-        return None
-    
     try:
-        logs_dir = get_logs_directory()
-        filepath = logs_dir / get_log_filename("pnl_reports")
-        wb = create_workbook_if_not_exists(filepath)
-        
         headers = [
             "Timestamp", "Total Open Positions", "Total Unrealized PnL USD",
             "Daily Realized PnL USD", "Total PnL USD"
         ]
         
-        ws = ensure_sheet_exists(wb, "PnL Reports", headers)
-        
-        # Find next empty row
-        next_row = ws.max_row + 1
-        
         if timestamp is None:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            timestamp = _now_str()
         
         total_pnl = daily_pnl + pnl_data.get('total_pnl', 0)
         
@@ -259,53 +374,46 @@ def log_pnl_report(pnl_data: Dict, daily_pnl: float, timestamp: Optional[str] =
             total_pnl
         ]
         
-        for col_idx, value in enumerate(row_data, start=1):
-            ws.cell(row=next_row, column=col_idx, value=value)
-        
-        wb.save(filepath)
+        filepath = _append_rows("pnl_reports", "PnL Reports", headers, [row_data])
         return str(filepath)
         
     except Exception as e:
-        print(f"❌ Error logging PnL report: {e}")
+        log.error("❌ Error logging PnL report: %s", e)
         return None
 
 
-def log_signal_history(signal_history: List[Dict]) -> Optional[str]:
+@_requires_log_backend
+def log_signal_history(signal_history: List[Dict], timestamp: Optional[str] = None) -> Optional[str]:
     """
     Log AI signal history to Excel file
     
     Args:
         signal_history: List of signal dictionaries
+        timestamp: Optional fallback timestamp for signals without a parseable time
     
     Returns:
         Filepath of created log file, or None if failed
     """
-    if not OPENPYXL_AVAILABLE:
+    if not signal_history:
         return None
     
     try:
-        logs_dir = get_logs_directory()
-        filepath = logs_dir / get_log_filename("signal_history")
-        wb = create_workbook_if_not_exists(filepath)
-        
         headers = [
             "Timestamp", "Signal", "Outcome", "Market", "Asset ID", "Action", "Confidence"
         ]
         
-        ws = ensure_sheet_exists(wb, "Signal History", headers)
+        if timestamp is None:
+            timestamp = _now_str()
         
-        # Find next empty row
-        next_row = ws.max_row + 1
+        rows = []
         
         # Log each signal
         for signal in signal_history:
-            timestamp = signal.get('timestamp', datetime.now().isoformat())
-            if isinstance(timestamp, str):
-                try:
-                    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
-                except:
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            row_timestamp = signal.get('timestamp')
+            if isinstance(row_timestamp, str):
+                row_timestamp = _fmt_iso(row_timestamp)
+            if row_timestamp is None:
+                row_timestamp = timestamp
             
             signal_data = signal.get('signal', {})
             if isinstance(signal_data, dict):
@@ -320,7 +428,7 @@ def log_signal_history(signal_history: List[Dict]) -> Optional[str]:
                 asset_id = 'N/A'
             
             row_data = [
-                timestamp,
+                row_timestamp,
                 str(signal_data)[:100],  # Truncate signal data
                 signal.get('outcome', 'pending'),
                 market,
@@ -329,21 +437,20 @@ def log_signal_history(signal_history: List[Dict]) -> Optional[str]:
                 confidence
             ]
             
-            for col_idx, value in enumerate(row_data, start=1):
-                ws.cell(row=next_row, column=col_idx, value=value)
-            
-            next_row += 1
+            rows.append(row_data)
         
-        wb.save(filepath)
+        filepath = _append_rows("signal_history", "Signal History", headers, rows)
         return str(filepath)
         
     except Exception as e:
-        print(f"❌ Error logging signal history: {e}")
+        log.error("❌ Error logging signal history: %s", e)
         return None
 
 
+@_requires_log_backend
 def log_trading_summary(open_positions: List[Dict], closed_positions: List[Dict],
-                       daily_pnl: float, pnl_data: Optional[Dict] = None) -> Optional[str]:
+                       daily_pnl: float, pnl_data: Optional[Dict] = None,
+                       timestamp: Optional[str] = None) -> Optional[str]:
     """
     Log complete trading summary to Excel file
     
@@ -352,24 +459,17 @@ def log_trading_summary(open_positions: List[Dict], closed_positions: List[Dict]
         closed_positions: List of closed positions
         daily_pnl: Daily realized PnL
         pnl_data: Optional PnL calculation data
+        timestamp: Optional timestamp string, shared with the position logs written here
     
     Returns:
         Filepath of created log file, or None if failed
     """
-    if not OPENPYXL_AVAILABLE:
-        return None
-    
     try:
-        logs_dir = get_logs_directory()
-        filepath = logs_dir / get_log_filename("trading_summary")
-        wb = create_workbook_if_not_exists(filepath)
-        
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if timestamp is None:
+            timestamp = _now_str()
         
         # Summary sheet
         summary_headers = ["Metric", "Value", "Timestamp"]
-        ws_summary = ensure_sheet_exists(wb, "Summary", summary_headers)
-        next_row = ws_summary.max_row + 1
         
         total_realized_pnl = sum(p.get('pnl_usd', 0) for p in closed_positions)
         total_unrealized_pnl = pnl_data.get('total_pnl', 0) if pnl_data else 0
@@ -384,21 +484,17 @@ def log_trading_summary(open_positions: List[Dict], closed_positions: List[Dict]
             ["Total PnL USD", total_pnl, timestamp],
         ]
         
-        for row_data in summary_data:
-            for col_idx, value in enumerate(row_data, start=1):
-                ws_summary.cell(row=next_row, column=col_idx, value=value)
-            next_row += 1
+        filepath = _append_rows("trading_summary", "Summary", summary_headers, summary_data)
         
         # Also log open and closed positions in separate sheets
         if open_positions:
-            log_open_positions(open_positions, pnl_data=pnl_data)
+            log_open_positions(open_positions, pnl_data=pnl_data, timestamp=timestamp)
         
         if closed_positions:
-            log_closed_positions(closed_positions)
+            log_closed_positions(closed_positions, timestamp=timestamp)
         
-        wb.save(filepath)
         return str(filepath)
         
     except Exception as e:
-        print(f"❌ Error logging trading summary: {e}")
+        log.error("❌ Error logging trading summary: %s", e)
         return None
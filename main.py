@@ -4,65 +4,135 @@ V2 Trading Bot Launcher - Enhanced AI with Liquidity Intelligence
 """
 import os
 import sys
-from pathlib import Path
-
-script_dir = Path(__file__).parent.absolute()
-os.chdir(script_dir)
-
-# Manually load .env file
-env_path = Path('.env')
-if env_path.exists():
-    for line in env_path.read_text().split('\n'):
-        line = line.strip()
-        if line and '=' in line and not line.startswith('#'):
-            key, value = line.split('=', 1)
-            os.environ[key.strip()] = value.strip()
-    print("Environment variables loaded")
+import mmap
+import logging
+
+try:
+    from env_parse import parse as _parse_env_bytes  # Optional compiled parser (build: cythonize -i env_parse.pyx)
+    ENV_PARSE_AVAILABLE = True
+except ImportError:
+    ENV_PARSE_AVAILABLE = False
+
+
+def _parse_env(f):
+    """Yield (key, value) pairs from an open (binary) .env file in one pass over a read-only mmap"""
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        return  # Empty file - nothing to map
+    with mm:
+        readline = mm.readline
+        while line := readline():
+            eq = line.find(b'=')
+            if eq < 0:
+                continue
+            key = line[:eq].strip()
+            if not key or key.startswith(b'#'):
+                continue
+            # Only the two slices around '=' are decoded
+            yield key.decode('utf-8'), line[eq + 1:].strip().decode('utf-8')
+
+
+# Written by an earlier version of the launcher: a second, marshal'd copy of the .env secrets - removed on sight
+_STALE_ENV_CACHE = '.env.cache'
+
+
+def _make_bot():
+    """Import and build the bot - only called once config is valid, since it pulls in the whole trading stack (AI clients, web3, ...)"""
+    from trading_bot import AITradingBotV2
+    return AITradingBotV2()
+
+
+# Status glyphs - ASCII stand-ins when stdout can't encode emoji (legacy Windows code pages, some pipes)
+if (sys.stdout.encoding or '').lower().startswith('utf'):
+    _OK, _WARN, _BOT, _NEW, _DOT, _GO, _CLOCK, _STOP, _ERR = ('✅', '⚠️ ', '🤖', '✨', '•', '🚀', '⏰', '🛑', '❌')
 else:
-    print(".env file not found!")
-    sys.exit(1)
-
-# Check for at least one AI API key (RPC_URL and PRIVATE_KEY not needed for simulation mode)
-anthropic_key = os.getenv('ANTHROPIC_API_KEY')
-openai_key = os.getenv('OPENAI_API_KEY')
-if not anthropic_key and not openai_key:
-    print("Missing AI API key: At least one of ANTHROPIC_API_KEY or OPENAI_API_KEY must be set")
-    sys.exit(1)
-
-print(f"✅ Configuration validated (Simulation Mode)")
-if openai_key:
-    print(f"   ✅ OpenAI API key found (primary)")
-if anthropic_key:
-    print(f"   ✅ Anthropic API key found (disabled - no credits)")
-print(f"   ⚠️  Simulation Mode: RPC_URL and PRIVATE_KEY not required")
-print()
-
-# Import and run bot
-from trading_bot import AITradingBotV2
+    _OK, _WARN, _BOT, _NEW, _DOT, _GO, _CLOCK, _STOP, _ERR = ('[OK]', '[!]', '[bot]', '*', '-', '>>', '..', '[stop]', '[X]')
 
-if __name__ == "__main__":
-    print("🤖 AI Trading Bot V2 - SIMULATION MODE")
-    print("=" * 60)
-    print("⚠️  SIMULATION MODE: No actual transactions will be executed")
-    print("=" * 60)
-    print("✨ Features:")
-    print("   • Trade simulation (records buy/sell prices)")
-    print("   • PnL calculation every 5 minutes")
-    print("   • AI-powered decisions (GPT-4o)")
-    print("   • Liquidity flow tracking (smart money)")
-    print("   • Liquidity flow tracking (smart money)")
-    print("   • Enhanced risk management")
-    print("=" * 60)
+# Startup banner, built once and written in a single call
+_BANNER = "\n".join([
+    f"{_BOT} AI Trading Bot V2 - SIMULATION MODE",
+    "=" * 60,
+    f"{_WARN} SIMULATION MODE: No actual transactions will be executed",
+    "=" * 60,
+    f"{_NEW} Features:",
+    f"   {_DOT} Trade simulation (records buy/sell prices)",
+    f"   {_DOT} PnL calculation every 5 minutes",
+    f"   {_DOT} AI-powered decisions (GPT-4o)",
+    f"   {_DOT} Liquidity flow tracking (smart money)",
+    f"   {_DOT} Enhanced risk management",
+    "=" * 60,
+    "",
+])
+
+
+def _bootstrap_env():
+    """
+    Load .env from the script directory and check that an AI API key is set (exits otherwise)
+
+    Returns:
+        Tuple of (openai_key, anthropic_key)
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
 
+    # Manually load .env file - one open() doubles as the existence check
     try:
-        bot = AITradingBotV2()
-        print("\n🚀 Bot initialized successfully!")
-        print("\n⏰ Running trading simulation with enhanced AI...")
+        fh = open(os.path.join(script_dir, '.env'), 'rb')
+    except FileNotFoundError:
+        print(".env file not found!")
+        sys.exit(1)
+    with fh:
+        parsed = _parse_env_bytes(fh.read()) if ENV_PARSE_AVAILABLE else dict(_parse_env(fh))
+    try:
+        os.remove(os.path.join(script_dir, _STALE_ENV_CACHE))
+    except OSError:
+        pass  # None left over (the usual case) or not ours to remove
+    # Variables already set in the shell win (dotenv's override=False) - only missing keys are written,
+    # in one batched update instead of a putenv per line
+    env = os.environ
+    env.update({key: value for key, value in parsed.items() if key not in env})
+    print("Environment variables loaded")
+
+    # Check for at least one AI API key (RPC_URL and PRIVATE_KEY not needed for simulation mode)
+    keys = (env.get('OPENAI_API_KEY'), env.get('ANTHROPIC_API_KEY'))
+    if not any(keys):
+        print("Missing AI API key: At least one of ANTHROPIC_API_KEY or OPENAI_API_KEY must be set")
+        sys.exit(1)
+
+    return keys
+
+
+def main():
+    """Launcher entry point: load config, print the banner, then build and run the bot"""
+    # Module warnings/errors go to stdout alongside the bot's own output
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+
+    openai_key, anthropic_key = _bootstrap_env()
+
+    print(f"{_OK} Configuration validated (Simulation Mode)")
+    if openai_key:
+        print(f"   {_OK} OpenAI API key found (primary)")
+    if anthropic_key:
+        print(f"   {_OK} Anthropic API key found (disabled - no credits)")
+    print(f"   {_WARN} Simulation Mode: RPC_URL and PRIVATE_KEY not required")
+    print()
+
+    sys.stdout.write(_BANNER)
+    sys.stdout.flush()
+
+    try:
+        bot = _make_bot()
+        print(f"\n{_GO} Bot initialized successfully!")
+        print(f"\n{_CLOCK} Running trading simulation with enhanced AI...")
         print("=" * 60)
         bot.run(interval=60)
     except KeyboardInterrupt:
-        print("\n\n🛑 Bot stopped by user")
+        print(f"\n\n{_STOP} Bot stopped by user")
     except Exception as e:
-        print(f"\n❌ Error: {e}")
+        print(f"\n{_ERR} Error: {e}")
         import traceback
         traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,19 @@
 """
 Market Data Fetcher - Fetches live data from Bitquery for the real trading bot
 """
-import os
-import requests
+import functools
+import json
 from typing import Dict, List
 from collections import defaultdict
-import json
-
-
-BITQUERY_API_KEY = os.getenv('BITQUERY_API_KEY')
 
+from bitquery_client import dumps, graphql_post
 
-def fetch_polymarket_data(limit: int = 100, required_tokens: List[Dict] = None) -> Dict:
-    """
-    Fetch recent DEX trades from Polymarket via Bitquery GraphQL API
-    """
-    url = "https://streaming.bitquery.io/graphql"
 
-    query = """
-    query PolygonDEXTrades {
+DEX_TRADES_QUERY = """
+    query PolygonDEXTrades($limit: Int!) {
         EVM(network: matic) {
             DEXTradeByTokens(
-            limit: {count: 200}
+            limit: {count: $limit}
             orderBy: {descending: Block_Time}
             where: {
                 TransactionStatus: {Success: true}, 
@@ -58,36 +50,24 @@ def fetch_polymarket_data(limit: int = 100, required_tokens: List[Dict] = None)
     }
     """
 
-    try:
-        response = requests.post(
-            url,
-            json={
-                'query': query
-            },
-            headers={
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {BITQUERY_API_KEY}'
-            },
-            timeout=10
-        )
-
-        if response.status_code != 200:
-            print(f"❌ Bitquery API error: {response.status_code}")
-            return None
-
-        data = response.json()
-        trades = data.get('data', {}).get('EVM', {}).get('DEXTradeByTokens', [])
-
-        if not trades:
-            print("⚠️  No trades returned from Bitquery")
-            return None
-
-        return process_trades(trades, required_tokens)
-
-    except Exception as e:
-        print(f"❌ Error fetching Bitquery data: {e}")
+
+@functools.lru_cache(maxsize=8)
+def _dex_trades_body(limit: int) -> bytes:
+    """Encoded request body - the query is constant, so this only varies (and is cached) by limit"""
+    return dumps({'query': DEX_TRADES_QUERY, 'variables': {'limit': limit}})
+
+
+def fetch_polymarket_data(limit: int = 100, required_tokens: List[Dict] = None) -> Dict:
+    """
+    Fetch recent DEX trades from Polymarket via Bitquery GraphQL API
+    """
+    # Shared Bitquery session/retry/decoding path - see bitquery_client.graphql_post
+    trades = graphql_post(_dex_trades_body(limit), 'data.EVM.DEXTradeByTokens', 'DEX trades')
+    if not trades:
         return None
 
+    return process_trades(trades, required_tokens)
+
 
 def process_trades(trades: List[Dict], required_tokens: List[Dict] = None) -> Dict:
     """
@@ -196,7 +176,7 @@ if __name__ == "__main__":
     data = get_market_data_for_trading()
 
     if data:
-        print(f"\n✅ Successfully fetched market data")
+        print("\n✅ Successfully fetched market data")
         print(json.dumps(data, indent=2))
     else:
         print("\n❌ Failed to fetch market data")
@@ -6,21 +6,338 @@ APIs → Parse → Pass ALL to AI → Let AI Find Opportunities
 """
 
 import os
-import json
+import sys
 import time
+import threading
+import asyncio
+import atexit
+import csv
+import contextlib
+import logging
+import traceback
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
+# Before the local imports below - logs (LOG_FORMAT), liquidity_data (LIQUIDITY_TTL) and bitquery_client
+# (BITQUERY_API_KEY) read their settings at import time
+load_dotenv()
 import anthropic
 try:
     import openai
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    NUMBA_AVAILABLE = False
 from config import BASE_MAINNET
 from liquidity_data import get_enhanced_market_data
+from logs import (flush_logs, get_logs_directory, log_open_positions, log_pnl_report,
+                  log_signal_history, log_trading_summary)
+from ai_payload import ActionStreamParser, build_symbol_index, loads, strip_hidden_fields, to_compact_json
 
-load_dotenv()
+
+def _pnl_kernel(entry, amount, current, out_usd, out_pct) -> float:
+    """
+    Per-position PnL over parallel arrays (entry price, size in USD, current price)
+    Fills out_usd/out_pct in place and returns the total USD PnL
+    """
+    total = 0.0
+    for i in range(len(entry)):
+        ratio = (current[i] - entry[i]) / entry[i]
+        out_pct[i] = ratio * 100
+        out_usd[i] = ratio * amount[i]
+        total += out_usd[i]
+    return total
+
+
+if NUMBA_AVAILABLE:
+    # Compiled once (cached on disk); the plain-Python loop above is the fallback
+    _pnl_kernel = njit(cache=True, fastmath=True)(_pnl_kernel)
+
+
+def _warm_pnl_kernel():
+    """Trigger the kernel's JIT compile (or on-disk cache load) with a 1-element call, so no trading cycle pays for it"""
+    if NUMBA_AVAILABLE:
+        one = np.ones(1)
+        _pnl_kernel(one, one, one, np.empty(1), np.empty(1))
+
+
+# Console lines printed for every action/position, each formatted and printed in one call
+_LEVELS_FMT = "   Entry: ${:.8f}\n   Target: ${:.8f}\n   Stop Loss: ${:.8f}"
+_SIGNAL_FMT = "   Confidence: {}%\n   Reasoning: {}..."
+_PNL_LINE_FMT = "   {}. {} {}\n      Entry: ${:.8f} | Current: ${:.8f}\n      PnL: ${:.4f} ({:+.2f}%) | Size: ${:.2f}"
+
+# Static sections of the generate_ai_actions prompt, stored once instead of re-materialized
+# from a ~6 KB f-string every tick. Only the JSON payloads and the status block vary per tick;
+# _PROMPT_TAIL's config slots are rendered once per bot in __init__.
+_PROMPT_HEADER = """You are an expert crypto trading AI with FULL CONTROL. You decide ALL actions - the system only executes what you decide.
+
+⚠️ TESTING MODE: Be lenient - find ANY reasonable trading opportunity to test the system.
+
+AVAILABLE DATA:
+TRADE DATA (raw JSON):
+"""
+
+_PROMPT_LIQUIDITY = """
+
+IMPORTANT: In Polymarket trade data:
+- "recent_price" or "price" represents the ODDS/PROBABILITY (0-1 range) that the prediction will be true
+  * Example: price=0.75 means 75% probability the prediction is true
+  * Example: price=0.25 means 25% probability (75% probability it's false)
+- "asset_id" is the unique identifier for the asset token (e.g., YES token ID for a particular question)
+- Higher price/odds = higher market confidence the prediction will be true
+- Lower price/odds = lower market confidence (higher confidence it will be false)
+
+LIQUIDITY EVENTS - OrdersMatched (Polymarket Order Book):
+"""
+
+_PROMPT_POSITIONS = """
+
+IMPORTANT: OrdersMatched events show liquidity provision activity:
+- "takerOrderMaker": Address of trader placing the order
+- "takerAssetId": Asset ID being traded (matches asset_id in trade data)
+- "takerAmountFilled": Amount of tokens trader wants to buy (order size)
+- "makerAmountFilled": Amount of tokens liquidity provider can provide
+- Higher makerAmountFilled = more liquidity available for that asset
+- Track which assets have active liquidity providers (smart money)
+
+OPEN POSITIONS (m=market,a=action,e=entry,t=target,s=stop,c=current,v=value_usd):
+"""
+
+_PROMPT_PORTFOLIO = """
+
+WALLET BALANCES (s=symbol, usd=value):
+"""
+
+_PROMPT_STATUS = """
+
+PORTFOLIO STATUS:
+- Total Portfolio Value: ${total_value:.2f}
+- Open Positions: {open_count}/{max_open}
+- Daily PnL: ${daily_pnl:.2f}
+- Available Capital: ${available:.2f}
+- Wallet Balance: {balance:.6f} MATIC
+
+YOUR PERFORMANCE:
+- Actions generated: {signal_count}
+- Success rate: {accuracy:.1f}%
+"""
+
+_PROMPT_TAIL = """- Analyze your past decisions and adapt your strategy.
+
+YOUR FULL CONTROL - DECIDE ANY ACTION:
+
+IMPORTANT: You can see the COMPLETE WALLET PORTFOLIO above. Use this to:
+- Know which tokens you have available to trade FROM
+- Understand your total capital and position sizing
+- Make decisions based on your actual holdings, not assumptions
+
+1. POSITION MANAGEMENT:
+   - CLOSE: Close an open position (any reason - target hit, stop loss, market conditions, etc.)
+   - HOLD: Keep position open (explicitly state if you want to hold)
+   - PARTIAL_CLOSE: Close part of a position (specify amount_usd or percentage)
+
+2. NEW TRADES:
+   - BUY: Open a long position
+     * Use tokens from your portfolio as input (check portfolio balances)
+     * Specify which token to use as input if you have multiple options
+   - SELL: Open a short position (if supported)
+   
+3. MARKET MAKING (if you see opportunity):
+   - MARKET_MAKE: Provide liquidity at specific price range
+   - Specify: token, price_range_min, price_range_max, amount_usd
+
+4. RISK MANAGEMENT:
+   - ADJUST_STOP_LOSS: Modify stop loss for existing position
+   - ADJUST_TARGET: Modify target price for existing position
+
+5. WAIT:
+   - HOLD: Explicitly wait (or return empty array [])
+
+CONSTRAINTS:
+- Minimum confidence: {min_confidence}% (LOW for testing)
+- Gas cost per action: ~$0.10
+- Use token SYMBOL only (contract address mapped automatically)
+- Max position size: ${max_position_size}
+- Max open positions: {max_open_positions}
+
+YOUR TASK:
+Analyze ALL data and decide what actions to take. You have FULL CONTROL.
+- Review open positions - should any be closed, adjusted, or held?
+- Look for new opportunities - any trades to open?
+  * Use odds/probability (price) to assess market confidence
+  * Higher odds (e.g., 0.8) = market thinks prediction likely true
+  * Lower odds (e.g., 0.2) = market thinks prediction likely false
+  * Look for mispriced opportunities where your analysis differs from market odds
+- Consider market making - any liquidity opportunities?
+- Consider risk - any stop losses or targets to adjust?
+
+DECISION MAKING WITH ODDS:
+- When price/odds is HIGH (e.g., >0.7): Market is confident prediction will be true
+  * Consider BUY if you agree, or look for contrarian opportunities if you disagree
+- When price/odds is LOW (e.g., <0.3): Market is confident prediction will be false
+  * Consider contrarian positions if you see value
+- When price/odds is MID (e.g., 0.4-0.6): Market is uncertain
+  * May present opportunities if you have strong conviction
+- Use asset_id to track specific prediction tokens (e.g., YES tokens for specific questions)
+
+Return an array of actions. Each action must have: action, market, confidence, reasoning.
+For CLOSE/HOLD/ADJUST actions, only need: action, market, confidence, reasoning.
+For BUY/SELL/MARKET_MAKE, also need: entry_price, target_price, stop_loss (and amount_usd if different from default).
+
+Be lenient in testing mode - find opportunities to test the system.
+
+OUTPUT FORMAT (JSON only, no markdown):
+[
+  {{
+    "action": "CLOSE",
+    "market": "SYMBOL",
+    "confidence": 85,
+    "reasoning": "Target reached / Stop loss hit / Market conditions changed"
+  }},
+  {{
+    "action": "BUY",
+    "market": "SYMBOL",
+    "confidence": 45,
+    "entry_price": 1.23,
+    "target_price": 1.29,
+    "stop_loss": 1.19,
+    "reasoning": "Found opportunity based on [analysis]"
+  }},
+  {{
+    "action": "HOLD",
+    "market": "SYMBOL",
+    "confidence": 80,
+    "reasoning": "Position performing well, waiting for target"
+  }},
+  {{
+    "action": "MARKET_MAKE",
+    "market": "SYMBOL",
+    "confidence": 60,
+    "price_range_min": 1.20,
+    "price_range_max": 1.25,
+    "amount_usd": 0.5,
+    "reasoning": "Good liquidity opportunity at this range"
+  }}
+]
+"""
+
+
+# slots (no per-instance __dict__) needs Python 3.10+; older interpreters get a plain dataclass
+_DATACLASS_OPTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTS)
+class Position:
+    """
+    A simulated position - attribute access instead of string-keyed dict lookups in the PnL/dispatch loops
+    The close_* / pnl_* fields are filled in when the position is closed.
+    """
+    id: str
+    market: str
+    action: str
+    entry_price: float
+    target_price: float
+    stop_loss: float
+    confidence: float
+    reasoning: str
+    timestamp: str
+    amount_usd: float
+    token_out: str
+    contract_address: str = ''
+    asset_id: Optional[str] = None
+    simulated: bool = True
+    close_price: Optional[float] = None
+    close_reason: Optional[str] = None
+    pnl_usd: Optional[float] = None
+    pnl_pct: Optional[float] = None
+    closed_at: Optional[str] = None
+    symbol_key: str = field(init=False)  # Upper-cased token_out, computed once - the open-position index key
+
+    def __post_init__(self):
+        self.symbol_key = sys.intern(self.token_out.upper())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-dict copy for the Excel/CSV loggers (logs.py works on dicts)"""
+        return asdict(self)
+
+
+class _RollingMean:
+    """
+    Sum and mean of the last `size` recorded values - a ring plus a running total, O(1) per record
+    Record bools for a hit rate, or numbers (confidence, PnL) for a rolling average; each window stat is one instance.
+    """
+    __slots__ = ('_window', '_total')
+
+    def __init__(self, size: int):
+        self._window = deque(maxlen=size)
+        self._total = 0
+
+    def record(self, value: float):
+        """Add one value, retiring the oldest from the total once the window is full"""
+        window = self._window
+        if len(window) == window.maxlen:
+            self._total -= window[0]
+        window.append(value)
+        self._total += value
+
+    def __len__(self) -> int:
+        return len(self._window)
+
+    @property
+    def total(self) -> float:
+        """Sum over the window (hit count for bools)"""
+        return self._total
+
+    @property
+    def mean(self) -> float:
+        """Window average - the hit fraction in [0, 1] for bools (0 when nothing is recorded yet)"""
+        return self._total / len(self._window) if self._window else 0.0
+
+
+class _BufferedStdout:
+    """
+    stdout stand-in that collects writes and hands them to the real stream in one write per flush()
+    Only the creating thread is buffered - redirect_stdout is process-wide, so writes from other threads
+    (the AI I/O pool, callers of generate_ai_actions_future) pass straight through instead of waiting
+    for run() to flush. Everything else (encoding, isatty, fileno, ...) is delegated to the wrapped stream.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._parts = []
+        self._owner = threading.get_ident()
+
+    def write(self, text: str) -> int:
+        if threading.get_ident() != self._owner:
+            return self._stream.write(text)
+        self._parts.append(text)
+        return len(text)
+
+    def flush(self):
+        if self._parts and threading.get_ident() == self._owner:
+            self._stream.write(''.join(self._parts))
+            self._parts.clear()
+        self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _position_dicts(positions: List[Position]) -> List[Dict[str, Any]]:
+    """Positions as plain dicts for the Excel loggers"""
+    return [p.to_dict() for p in positions]
 
 
 class AITradingBotV2:
@@ -31,6 +348,9 @@ class AITradingBotV2:
     - Improved risk management
     """
 
+    # Most recent AI signals kept in memory (and written to the signal history log on shutdown)
+    SIGNAL_HISTORY_SIZE = 200
+
     def __init__(self):
         """Initialize the enhanced AI trading bot"""
 
@@ -58,6 +378,13 @@ class AITradingBotV2:
 
         # Validate and initialize
         self._validate_config()
+
+        # Prompt constraints only depend on config - render them once
+        self._prompt_tail = _PROMPT_TAIL.format(
+            min_confidence=self.min_confidence,
+            max_position_size=self.max_position_size,
+            max_open_positions=self.max_open_positions
+        )
         # Note: Web3 connection not needed for simulation mode
         # self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
         # if not self.w3.is_connected():
@@ -68,6 +395,10 @@ class AITradingBotV2:
         # self.wallet_address = self.account.address
         self.wallet_address = os.getenv('WALLET_ADDRESS', '0x0000000000000000000000000000000000000000')
         self.dex_config = BASE_MAINNET  # Now points to POLYGON_MAINNET
+        # Upper-cased (interned) symbol -> token address, built once; ETH resolves to WETH
+        self._tokens_uc = {sys.intern(k.upper()): v for k, v in self.dex_config['tokens'].items()}
+        if 'WETH' in self._tokens_uc:
+            self._tokens_uc.setdefault('ETH', self._tokens_uc['WETH'])
 
         # Router not needed for simulation
         # self.router = self.w3.eth.contract(
@@ -85,27 +416,79 @@ class AITradingBotV2:
         else:
             self.openai_client = None
 
+        # Async client for concurrent prompts (generate_ai_actions_batch)
+        if OPENAI_AVAILABLE and self.openai_api_key and hasattr(openai, 'AsyncOpenAI'):
+            self.async_openai_client = openai.AsyncOpenAI(api_key=self.openai_api_key)
+        else:
+            self.async_openai_client = None
+        self._async_loop = None  # Created on first batch, then reused until close()
+        # Worker threads for generate_ai_actions_future - the OpenAI round-trip blocks in socket I/O (GIL released),
+        # so several prompts wait concurrently; created on first submit, shut down by close()
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+        # Guards state that generate_ai_actions updates from _io_pool threads: signal_history, the success-rate
+        # windows and the lazily created pool itself
+        self._state_lock = threading.Lock()
+
         # Use OpenAI as primary provider
         self.use_openai = True
         print("ℹ️  Using OpenAI as primary AI provider (Anthropic disabled)")
 
         # Trading state
-        self.open_positions = []
-        self.closed_positions = []
+        self.open_positions: List[Position] = []
+        self.closed_positions: List[Position] = []
+        self._open_amount_total = 0.0  # Sum of amount_usd over open_positions, kept in step on open/close
+        self._positions_by_symbol: Dict[str, Position] = {}  # Upper-cased token_out -> first open position with it
         self.daily_pnl = 0.0
+        self.total_realized_pnl = 0.0  # Sum of pnl_usd over closed_positions, added to on each close
+        self._stop = threading.Event()  # Set by stop() (or Ctrl-C) to end run() without waiting out the cycle interval
+        self._last_action_ts = float('-inf')  # Monotonic time of the last throttled action (see _rate_limit)
+        # Wall-clock time of the current run() cycle, taken once at its start and shared by its banner, trades and
+        # signals - None outside run(), where _timestamp_iso() reads the clock instead
+        self._cycle_ts: Optional[datetime] = None
+        self._cycle_iso: Optional[str] = None
+        self._last_tb: Dict[str, float] = {}  # 'site:ExceptionClass' -> monotonic time its traceback was last printed (see _maybe_print_tb)
+
+        # Closed positions go to the Excel log in one batch at shutdown; meanwhile each close is one
+        # line in an append-only CSV journal, opened on the first close (line-buffered: one write() per close)
+        self._journal = self._journal_writer = None
+
+        # Action type -> bound executor, used by execute_action
+        self._handlers = {
+            'CLOSE': self._execute_close,
+            'HOLD': self._execute_hold,
+            'PARTIAL_CLOSE': self._execute_partial_close,
+            'BUY': self._execute_buy,
+            'SELL': self._execute_sell,
+            'MARKET_MAKE': self._execute_market_make,
+            'ADJUST_STOP_LOSS': self._execute_adjust_stop_loss,
+            'ADJUST_TARGET': self._execute_adjust_target,
+        }
+        _warm_pnl_kernel()
         self.is_trading_enabled = True
-        self.signal_history = []  # Track AI decisions for learning
-
-        print(f"✅ AI Trading Bot V2 Initialized - SIMULATION MODE")
+        # Limits only move when a position opens or closes (closes are the only daily_pnl change), so the last
+        # safety verdict is reused until _position_changes or is_trading_enabled differs (see _check_safety_limits)
+        self._position_changes = 0
+        self._safety_memo: Tuple[Optional[Tuple[int, bool]], bool] = (None, False)
+        # Track AI decisions for learning - bounded, so long runs don't pin every old signal dict
+        self.signal_history = deque(maxlen=self.SIGNAL_HISTORY_SIZE)
+        # Success rates over the newest signals - prompt (last 10) and status line (last 20)
+        self._prompt_success = _RollingMean(10)
+        self._status_success = _RollingMean(20)
+        self._decimals_cache = {}  # Token address -> decimals
+        self._address_cache = {}  # Symbol (as given) -> token address from _tokens_uc
+        self._price_cache: Dict[int, Tuple[Dict, Dict[str, float]]] = {}  # id(market_data) -> (market_data, price index), reset each cycle
+        self._symbol_cache: Dict[int, Tuple[Dict, Dict[str, Dict]]] = {}  # id(market_data) -> (market_data, symbol index), reset each cycle
+
+        print("✅ AI Trading Bot V2 Initialized - SIMULATION MODE")
         print(f"📍 Wallet: {self.wallet_address}")
         print(f"⛓️  Chain ID: {self.chain_id} (Polygon/Matic)")
-        print(f"⚠️  SIMULATION MODE: No actual transactions will be executed")
+        print("⚠️  SIMULATION MODE: No actual transactions will be executed")
         if self.use_openai:
             ai_provider = "OpenAI (GPT-4o)"
         else:
             ai_provider = "Anthropic (Claude Sonnet 4)"
         print(f"🤖 AI Provider: {ai_provider}")
-        print(f"🔒 Safety Limits:")
+        print("🔒 Safety Limits:")
         print(f"   - Portfolio: ${self.portfolio_size}")
         print(f"   - Max Position: ${self.max_position_size}")
         print(f"   - Daily Loss Limit: ${self.daily_loss_limit}")
@@ -145,7 +528,18 @@ class AITradingBotV2:
         return portfolio
 
     def _check_safety_limits(self) -> bool:
-        """Check trading safety limits"""
+        """Check trading safety limits - re-evaluated only after a position opened or closed"""
+        key = (self._position_changes, self.is_trading_enabled)
+        memo_key, verdict = self._safety_memo
+        if memo_key == key:
+            return verdict
+        verdict = self._evaluate_safety_limits()
+        # Keyed after evaluating: hitting the loss limit turns trading off, and that verdict sticks
+        self._safety_memo = ((self._position_changes, self.is_trading_enabled), verdict)
+        return verdict
+
+    def _evaluate_safety_limits(self) -> bool:
+        """The actual limit checks behind _check_safety_limits"""
         if not self.is_trading_enabled:
             return False
 
@@ -164,71 +558,34 @@ class AITradingBotV2:
 
         return True
 
+    def _timestamp_iso(self) -> str:
+        """ISO timestamp for new signals and positions - the current cycle's inside run(), the clock's otherwise"""
+        return self._cycle_iso or datetime.now().isoformat()
+
+    def _record_signal(self, signal: Dict):
+        """Append to signal_history and feed the rolling success rates (outcome as recorded)"""
+        hit = signal.get('outcome') == 'success'
+        with self._state_lock:
+            self.signal_history.append(signal)
+            self._prompt_success.record(hit)
+            self._status_success.record(hit)
+
     def _remove_smartcontract_fields(self, obj):
         """
         Remove SmartContract fields from data before sending to AI.
         Keep only Symbol for token identification - we'll map to contract later.
         """
-        if obj is None:
-            return None
-        
-        if isinstance(obj, dict):
-            filtered = {}
-            for k, v in obj.items():
-                # Skip SmartContract fields - AI doesn't need them
-                if k == 'SmartContract' or k == 'contract_address':
-                    continue
-                # Recursively filter nested objects
-                filtered[k] = self._remove_smartcontract_fields(v)
-            return filtered
-        
-        elif isinstance(obj, list):
-            return [self._remove_smartcontract_fields(item) for item in obj]
-        
-        else:
-            return obj
+        return strip_hidden_fields(obj)
 
-    def _to_compact_format(self, obj, depth=0):
-        """
-        Convert data to ultra-compact format for AI consumption.
-        Removes unnecessary JSON syntax (quotes, brackets) where possible.
-        """
-        if obj is None:
-            return "null"
-        
-        if isinstance(obj, dict):
-            if depth > 3:  # Limit nesting to prevent too much recursion
-                return json.dumps(obj, separators=(',', ':'))
-            items = []
-            for k, v in obj.items():
-                # Remove quotes from simple keys (alphanumeric + underscore)
-                if k.replace('_', '').replace('-', '').isalnum():
-                    key = k
-                else:
-                    key = f'"{k}"'
-                items.append(f"{key}:{self._to_compact_format(v, depth+1)}")
-            return "{" + ",".join(items) + "}"
-        
-        elif isinstance(obj, list):
-            if depth > 3:
-                return json.dumps(obj, separators=(',', ':'))
-            items = [self._to_compact_format(item, depth+1) for item in obj]
-            return "[" + ",".join(items) + "]"
-        
-        elif isinstance(obj, str):
-            # Only quote strings that need it (contain special chars or spaces)
-            if any(c in obj for c in [' ', ',', ':', '{', '}', '[', ']', '"', "'"]):
-                return json.dumps(obj)
-            return obj
-        
-        elif isinstance(obj, (int, float)):
-            return str(obj)
-        
-        elif isinstance(obj, bool):
-            return "true" if obj else "false"
-        
-        else:
-            return json.dumps(obj, separators=(',', ':'))
+    def _compact_for_ai(self, obj, empty: str) -> str:
+        """Filter hidden fields and serialize for the prompt in one step (empty/None payloads -> empty)"""
+        if not obj:
+            return empty
+        return self._to_compact_format(self._remove_smartcontract_fields(obj))
+
+    def _to_compact_format(self, obj) -> str:
+        """Serialize data to compact JSON for AI consumption (no whitespace)"""
+        return to_compact_json(obj)
 
     def generate_ai_actions(self, market_data: Dict) -> List[Dict]:
         """
@@ -242,185 +599,7 @@ class AITradingBotV2:
         - Fully AI-driven decision making
         """
         try:
-            # Extract raw data from new format - pass trade data and liquidity events to AI
-            trade_data = market_data.get('trade_data', {})
-            liquidity_events = market_data.get('liquidity_events', [])
-
-            # Calculate recent AI performance
-            recent_signals = self.signal_history[-10:] if self.signal_history else []
-            successful_signals = [s for s in recent_signals if s.get('outcome') == 'success']
-            ai_accuracy = len(successful_signals) / len(recent_signals) if recent_signals else 0
-
-            # Filter out SmartContract fields before sending to AI - only pass Symbol
-            # We'll map symbol to contract_address from trade_data when executing trades
-            trade_data_for_ai = self._remove_smartcontract_fields(trade_data) if trade_data else {}
-            liquidity_events_for_ai = self._remove_smartcontract_fields(liquidity_events) if liquidity_events else []
-
-            # Prepare data for AI - use ultra-compact format to minimize tokens
-            trade_data_json = self._to_compact_format(trade_data_for_ai) if trade_data_for_ai else "{}"
-            liquidity_events_json = self._to_compact_format(liquidity_events_for_ai) if liquidity_events_for_ai else "[]"
-            
-            # Prepare minimal open positions info for AI (only essential fields)
-            open_positions_info = []
-            for pos in self.open_positions:
-                current_price = self._get_token_price_usd(pos['token_out'], market_data) or pos['entry_price']
-                open_positions_info.append({
-                    'm': pos['token_out'],  # market
-                    'a': pos['action'],  # action
-                    'e': round(pos['entry_price'], 8),  # entry_price
-                    't': round(pos['target_price'], 8),  # target_price
-                    's': round(pos['stop_loss'], 8),  # stop_loss
-                    'c': round(current_price, 8),  # current_price
-                    'v': round(pos['amount_usd'], 2)  # value_usd
-                })
-            positions_json = self._to_compact_format(open_positions_info) if open_positions_info else "[]"
-            
-            # Get minimal wallet portfolio (only essential data)
-            wallet_portfolio = self._get_wallet_portfolio(market_data)
-            portfolio_json = self._to_compact_format(wallet_portfolio) if wallet_portfolio else "[]"
-            total_portfolio_value = sum(p['usd'] for p in wallet_portfolio)
-            
-            prompt = f"""You are an expert crypto trading AI with FULL CONTROL. You decide ALL actions - the system only executes what you decide.
-
-⚠️ TESTING MODE: Be lenient - find ANY reasonable trading opportunity to test the system.
-
-AVAILABLE DATA:
-TRADE DATA (raw JSON):
-{trade_data_json}
-
-IMPORTANT: In Polymarket trade data:
-- "recent_price" or "price" represents the ODDS/PROBABILITY (0-1 range) that the prediction will be true
-  * Example: price=0.75 means 75% probability the prediction is true
-  * Example: price=0.25 means 25% probability (75% probability it's false)
-- "asset_id" is the unique identifier for the asset token (e.g., YES token ID for a particular question)
-- Higher price/odds = higher market confidence the prediction will be true
-- Lower price/odds = lower market confidence (higher confidence it will be false)
-
-LIQUIDITY EVENTS - OrdersMatched (Polymarket Order Book):
-{liquidity_events_json}
-
-IMPORTANT: OrdersMatched events show liquidity provision activity:
-- "takerOrderMaker": Address of trader placing the order
-- "takerAssetId": Asset ID being traded (matches asset_id in trade data)
-- "takerAmountFilled": Amount of tokens trader wants to buy (order size)
-- "makerAmountFilled": Amount of tokens liquidity provider can provide
-- Higher makerAmountFilled = more liquidity available for that asset
-- Track which assets have active liquidity providers (smart money)
-
-OPEN POSITIONS (m=market,a=action,e=entry,t=target,s=stop,c=current,v=value_usd):
-{positions_json}
-
-WALLET BALANCES (s=symbol, usd=value):
-{portfolio_json}
-
-PORTFOLIO STATUS:
-- Total Portfolio Value: ${total_portfolio_value:.2f}
-- Open Positions: {len(self.open_positions)}/{self.max_open_positions}
-- Daily PnL: ${self.daily_pnl:.2f}
-- Available Capital: ${self.portfolio_size - sum(p.get('amount_usd', 0) for p in self.open_positions):.2f}
-- Wallet Balance: {self._get_balance():.6f} MATIC
-
-YOUR PERFORMANCE:
-- Actions generated: {len(recent_signals)}
-- Success rate: {ai_accuracy*100:.1f}%
-- Analyze your past decisions and adapt your strategy.
-
-YOUR FULL CONTROL - DECIDE ANY ACTION:
-
-IMPORTANT: You can see the COMPLETE WALLET PORTFOLIO above. Use this to:
-- Know which tokens you have available to trade FROM
-- Understand your total capital and position sizing
-- Make decisions based on your actual holdings, not assumptions
-
-1. POSITION MANAGEMENT:
-   - CLOSE: Close an open position (any reason - target hit, stop loss, market conditions, etc.)
-   - HOLD: Keep position open (explicitly state if you want to hold)
-   - PARTIAL_CLOSE: Close part of a position (specify amount_usd or percentage)
-
-2. NEW TRADES:
-   - BUY: Open a long position
-     * Use tokens from your portfolio as input (check portfolio balances)
-     * Specify which token to use as input if you have multiple options
-   - SELL: Open a short position (if supported)
-   
-3. MARKET MAKING (if you see opportunity):
-   - MARKET_MAKE: Provide liquidity at specific price range
-   - Specify: token, price_range_min, price_range_max, amount_usd
-
-4. RISK MANAGEMENT:
-   - ADJUST_STOP_LOSS: Modify stop loss for existing position
-   - ADJUST_TARGET: Modify target price for existing position
-
-5. WAIT:
-   - HOLD: Explicitly wait (or return empty array [])
-
-CONSTRAINTS:
-- Minimum confidence: {self.min_confidence}% (LOW for testing)
-- Gas cost per action: ~$0.10
-- Use token SYMBOL only (contract address mapped automatically)
-- Max position size: ${self.max_position_size}
-- Max open positions: {self.max_open_positions}
-
-YOUR TASK:
-Analyze ALL data and decide what actions to take. You have FULL CONTROL.
-- Review open positions - should any be closed, adjusted, or held?
-- Look for new opportunities - any trades to open?
-  * Use odds/probability (price) to assess market confidence
-  * Higher odds (e.g., 0.8) = market thinks prediction likely true
-  * Lower odds (e.g., 0.2) = market thinks prediction likely false
-  * Look for mispriced opportunities where your analysis differs from market odds
-- Consider market making - any liquidity opportunities?
-- Consider risk - any stop losses or targets to adjust?
-
-DECISION MAKING WITH ODDS:
-- When price/odds is HIGH (e.g., >0.7): Market is confident prediction will be true
-  * Consider BUY if you agree, or look for contrarian opportunities if you disagree
-- When price/odds is LOW (e.g., <0.3): Market is confident prediction will be false
-  * Consider contrarian positions if you see value
-- When price/odds is MID (e.g., 0.4-0.6): Market is uncertain
-  * May present opportunities if you have strong conviction
-- Use asset_id to track specific prediction tokens (e.g., YES tokens for specific questions)
-
-Return an array of actions. Each action must have: action, market, confidence, reasoning.
-For CLOSE/HOLD/ADJUST actions, only need: action, market, confidence, reasoning.
-For BUY/SELL/MARKET_MAKE, also need: entry_price, target_price, stop_loss (and amount_usd if different from default).
-
-Be lenient in testing mode - find opportunities to test the system.
-
-OUTPUT FORMAT (JSON only, no markdown):
-[
-  {{
-    "action": "CLOSE",
-    "market": "SYMBOL",
-    "confidence": 85,
-    "reasoning": "Target reached / Stop loss hit / Market conditions changed"
-  }},
-  {{
-    "action": "BUY",
-    "market": "SYMBOL",
-    "confidence": 45,
-    "entry_price": 1.23,
-    "target_price": 1.29,
-    "stop_loss": 1.19,
-    "reasoning": "Found opportunity based on [analysis]"
-  }},
-  {{
-    "action": "HOLD",
-    "market": "SYMBOL",
-    "confidence": 80,
-    "reasoning": "Position performing well, waiting for target"
-  }},
-  {{
-    "action": "MARKET_MAKE",
-    "market": "SYMBOL",
-    "confidence": 60,
-    "price_range_min": 1.20,
-    "price_range_max": 1.25,
-    "amount_usd": 0.5,
-    "reasoning": "Good liquidity opportunity at this range"
-  }}
-]
-"""
+            prompt = self._build_ai_prompt(market_data)
 
             # COMMENTED OUT: Anthropic API calls disabled
             # if not self.use_openai and self.claude:
@@ -438,13 +617,136 @@ OUTPUT FORMAT (JSON only, no markdown):
             #         self.use_openai = True
             #         response_text = self._generate_with_openai(prompt)
 
-            # Use OpenAI directly
+            # Use OpenAI directly - streamed, with actions parsed as each one completes
+            parser = ActionStreamParser()
             if self.use_openai and self.openai_client:
-                response_text = self._generate_with_openai(prompt, model="gpt-4o")
+                response_text = self._generate_with_openai(prompt, model="gpt-4o", stream_parser=parser)
             else:
                 raise Exception("❌ No AI client available. Please set OPENAI_API_KEY")
 
-            # Extract JSON
+            streamed = parser.elements if parser.closed and not parser.failed else None
+            return self._parse_ai_actions(response_text, market_data, streamed)
+
+        except Exception as e:
+            print(f"❌ Error generating AI actions: {e}")
+            self._maybe_print_tb('generate_ai_actions', e)
+            return []
+
+    def _build_ai_prompt(self, market_data: Dict) -> str:
+        """Build the full AI prompt for one market snapshot"""
+        # Extract raw data from new format - pass trade data and liquidity events to AI
+        trade_data = market_data.get('trade_data', {})
+        liquidity_events = market_data.get('liquidity_events', [])
+
+        # Calculate recent AI performance
+        with self._state_lock:
+            ai_accuracy = self._prompt_success.mean
+            signal_count = len(self._prompt_success)
+
+        # Filter out SmartContract fields and serialize compactly for the AI - only pass Symbol
+        # We'll map symbol to contract_address from trade_data when executing trades
+        trade_data_json = self._compact_for_ai(trade_data, "{}")
+        liquidity_events_json = self._compact_for_ai(liquidity_events, "[]")
+
+        # Prepare minimal open positions info for AI (only essential fields)
+        # One comprehension with locally bound helpers - no per-iteration global/attribute lookups
+        _round, _price = round, self._get_token_price_usd
+        open_positions_info = [{
+            'm': pos.token_out,  # market
+            'a': pos.action,  # action
+            'e': _round(pos.entry_price, 8),  # entry_price
+            't': _round(pos.target_price, 8),  # target_price
+            's': _round(pos.stop_loss, 8),  # stop_loss
+            'c': _round(_price(pos.token_out, market_data) or pos.entry_price, 8),  # current_price
+            'v': _round(pos.amount_usd, 2)  # value_usd
+        } for pos in self.open_positions]
+        positions_json = self._to_compact_format(open_positions_info) if open_positions_info else "[]"
+
+        # Get minimal wallet portfolio (only essential data)
+        wallet_portfolio = self._get_wallet_portfolio(market_data)
+        portfolio_json = self._to_compact_format(wallet_portfolio) if wallet_portfolio else "[]"
+        total_portfolio_value = sum(p['usd'] for p in wallet_portfolio)
+
+        prompt = "".join((
+            _PROMPT_HEADER, trade_data_json,
+            _PROMPT_LIQUIDITY, liquidity_events_json,
+            _PROMPT_POSITIONS, positions_json,
+            _PROMPT_PORTFOLIO, portfolio_json,
+            _PROMPT_STATUS.format(
+                total_value=total_portfolio_value,
+                open_count=len(self.open_positions),
+                max_open=self.max_open_positions,
+                daily_pnl=self.daily_pnl,
+                available=self.portfolio_size - self._open_amount_total,
+                balance=self._get_balance(),
+                signal_count=signal_count,
+                accuracy=ai_accuracy * 100
+            ),
+            self._prompt_tail
+        ))
+
+        return prompt
+
+    def _validate_position_action(self, action: str, action_data: Dict, symbol_index: Dict) -> bool:
+        """Position management actions (CLOSE, HOLD, PARTIAL_CLOSE) - check if position exists"""
+        market_symbol = action_data['market'].upper()
+        position_exists = market_symbol in self._positions_by_symbol
+        if not position_exists and action != 'HOLD':
+            print(f"⚠️  {action} signal for {market_symbol} but no open position found, skipping")
+            return False
+        return True
+
+    def _validate_trade_action(self, action: str, action_data: Dict, symbol_index: Dict) -> bool:
+        """Trading actions (BUY, SELL, MARKET_MAKE) - map symbol to contract_address and asset_id"""
+        # One index lookup
+        market_symbol = action_data['market'].upper()
+        market = symbol_index.get(market_symbol)
+        contract_address = market.get('contract_address', '') if market else None
+        asset_id = market.get('asset_id') if market else None
+
+        if contract_address:
+            action_data['contract_address'] = contract_address
+        if asset_id:
+            action_data['asset_id'] = asset_id
+
+        if not contract_address:
+            print(f"⚠️  Could not map symbol {market_symbol} to contract address, skipping")
+            return False
+        return True
+
+    def _validate_risk_action(self, action: str, action_data: Dict, symbol_index: Dict) -> bool:
+        """Risk management actions (ADJUST_STOP_LOSS, ADJUST_TARGET) - position must exist"""
+        market_symbol = action_data['market'].upper()
+        position_exists = market_symbol in self._positions_by_symbol
+        if not position_exists:
+            print(f"⚠️  {action} signal for {market_symbol} but no open position found, skipping")
+            return False
+        return True
+
+    # Fields every action needs, and the extra ones each action type requires
+    _BASE_FIELDS = frozenset(('action', 'market', 'confidence'))
+    _TRADE_FIELDS = _BASE_FIELDS | {'entry_price', 'target_price', 'stop_loss'}
+    _RISK_FIELDS = _BASE_FIELDS | {'new_value'}
+
+    # Action type -> (required fields, message when any are missing, validator)
+    _ACTION_HANDLERS = {
+        **dict.fromkeys(('CLOSE', 'HOLD', 'PARTIAL_CLOSE'),
+                        (_BASE_FIELDS, '', _validate_position_action)),
+        **dict.fromkeys(('BUY', 'SELL', 'MARKET_MAKE'),
+                        (_TRADE_FIELDS, "⚠️  Skipping invalid {action} action (missing price fields): {market}",
+                         _validate_trade_action)),
+        **dict.fromkeys(('ADJUST_STOP_LOSS', 'ADJUST_TARGET'),
+                        (_RISK_FIELDS, "⚠️  Skipping {action} - missing new_value field", _validate_risk_action)),
+    }
+
+    def _parse_ai_actions(self, response_text: str, market_data: Dict,
+                          actions: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        Extract, validate and record the action array from an AI response
+        actions: elements already parsed while streaming - the response text is only re-scanned without them
+        """
+        if actions is None:
+            # Extract JSON - str.find/rfind already run as C memchr-style scans
             start_idx = response_text.find('[')
             end_idx = response_text.rfind(']') + 1
 
@@ -452,156 +754,189 @@ OUTPUT FORMAT (JSON only, no markdown):
                 print("⚠️  AI did not generate actions (waiting for better conditions)")
                 return []
 
-            actions = json.loads(response_text[start_idx:end_idx])
-
-            # Validate and enrich actions - flexible validation based on action type
-            validated_actions = []
-            for action_data in actions:
-                action = action_data.get('action', '').upper()
-                
-                # All actions require: action, market, confidence, reasoning
-                base_required = ['action', 'market', 'confidence']
-                if not all(field in action_data for field in base_required):
-                    print(f"⚠️  Skipping invalid action (missing base fields): {action_data.get('market', 'unknown')}")
-                    continue
-                
-                # Check confidence threshold
-                if action_data['confidence'] < self.min_confidence:
-                    print(f"⚠️  Skipping {action} {action_data.get('market')} - confidence {action_data['confidence']}% below threshold {self.min_confidence}%")
-                    continue
-                
-                # Action-specific validation
-                if action in ['CLOSE', 'HOLD', 'PARTIAL_CLOSE']:
-                    # Position management actions - check if position exists
-                    market_symbol = action_data['market'].upper()
-                    position_exists = any(p['token_out'].upper() == market_symbol for p in self.open_positions)
-                    if not position_exists and action != 'HOLD':
-                        print(f"⚠️  {action} signal for {market_symbol} but no open position found, skipping")
-                        continue
-                    validated_actions.append(action_data)
-                    continue
-                
-                elif action in ['BUY', 'SELL', 'MARKET_MAKE']:
-                    # Trading actions - require price fields
-                    required = ['action', 'market', 'confidence', 'entry_price', 'target_price', 'stop_loss']
-                    if not all(field in action_data for field in required):
-                        print(f"⚠️  Skipping invalid {action} action (missing price fields): {action_data.get('market', 'unknown')}")
-                        continue
-                    
-                    # Map symbol to contract_address and asset_id
-                    market_symbol = action_data['market'].upper()
-                    contract_address = self._find_contract_address(market_symbol, trade_data, liquidity_events)
-                    
-                    # Extract asset_id from trade_data
-                    asset_id = None
-                    markets = trade_data.get('top_markets', []) if trade_data else []
-                    for m in markets:
-                        if m.get('symbol', '').upper() == market_symbol:
-                            asset_id = m.get('asset_id')
-                            break
-                    
-                    if contract_address:
-                        action_data['contract_address'] = contract_address
-                    if asset_id:
-                        action_data['asset_id'] = asset_id
-                    
-                    if not contract_address:
-                        print(f"⚠️  Could not map symbol {market_symbol} to contract address, skipping")
-                        continue
-                    
-                    validated_actions.append(action_data)
-                    continue
-                
-                elif action in ['ADJUST_STOP_LOSS', 'ADJUST_TARGET']:
-                    # Risk management actions - require new value
-                    if 'new_value' not in action_data:
-                        print(f"⚠️  Skipping {action} - missing new_value field")
-                        continue
-                    
-                    market_symbol = action_data['market'].upper()
-                    position_exists = any(p['token_out'].upper() == market_symbol for p in self.open_positions)
-                    if not position_exists:
-                        print(f"⚠️  {action} signal for {market_symbol} but no open position found, skipping")
-                        continue
-                    
-                    validated_actions.append(action_data)
-                    continue
-                
-                else:
-                    print(f"⚠️  Unknown action type: {action}, skipping")
-                    continue
-
-            # Store actions for performance tracking
-            for action in validated_actions:
-                self.signal_history.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'signal': action,
-                    'outcome': 'pending'  # Will update later
-                })
-
-            return validated_actions
-
-        except Exception as e:
-            print(f"❌ Error generating AI actions: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
+            json_text = response_text[start_idx:end_idx]
+            actions = loads(json_text)
+
+        # Symbol -> market entry, built once per tick and shared with _execute_trade
+        symbol_index = self._symbol_index_for(market_data)
+
+        # Validate and enrich actions - flexible validation based on action type
+        validated_actions = []
+        base_required = self._BASE_FIELDS
+        handlers = self._ACTION_HANDLERS
+        for action_data in actions:
+            action = action_data.get('action', '').upper()
+
+            # All actions require: action, market, confidence, reasoning
+            if not base_required.issubset(action_data):
+                print(f"⚠️  Skipping invalid action (missing base fields): {action_data.get('market', 'unknown')}")
+                continue
+
+            # Check confidence threshold
+            if action_data['confidence'] < self.min_confidence:
+                print(f"⚠️  Skipping {action} {action_data.get('market')} - confidence {action_data['confidence']}% below threshold {self.min_confidence}%")
+                continue
+
+            # Action-specific validation - one table lookup instead of a chain of membership tests
+            handler = handlers.get(action)
+            if handler is None:
+                print(f"⚠️  Unknown action type: {action}, skipping")
+                continue
+            required, missing_msg, validate = handler
+            if not required.issubset(action_data):
+                print(missing_msg.format(action=action, market=action_data.get('market', 'unknown')))
+                continue
+            if validate(self, action, action_data, symbol_index):
+                validated_actions.append(action_data)
+
+        # Store actions for performance tracking
+        for action in validated_actions:
+            self._record_signal({
+                'timestamp': self._timestamp_iso(),
+                'signal': action,
+                'outcome': 'pending'  # Will update later
+            })
+
+        return validated_actions
+
+    def _openai_request(self, prompt: str, model: str) -> Dict:
+        """Chat completion arguments shared by the sync and async OpenAI calls"""
+        return {
+            'model': model,
+            'messages': [
+                {"role": "system", "content": "You are an advanced crypto trading AI. Always respond with valid JSON arrays only."},
+                {"role": "user", "content": prompt}
+            ],
+            'max_tokens': 2500,
+            'temperature': 0.7
+        }
 
-    def _generate_with_openai(self, prompt: str, model: str = "gpt-4o") -> str:
-        """Generate response using OpenAI API"""
+    def _generate_with_openai(self, prompt: str, model: str = "gpt-4o",
+                              stream_parser: Optional[ActionStreamParser] = None) -> str:
+        """
+        Generate response using OpenAI API
+        With a stream_parser the response is streamed and fed to it chunk by chunk as it arrives
+        """
         if not self.openai_client:
             raise Exception("❌ OpenAI client not available")
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "You are an advanced crypto trading AI. Always respond with valid JSON arrays only."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=2500,
-                temperature=0.7
-            )
+            if stream_parser is None:
+                response = self.openai_client.chat.completions.create(**self._openai_request(prompt, model))
+                return response.choices[0].message.content
+
+            parts = []
+            for chunk in self.openai_client.chat.completions.create(**self._openai_request(prompt, model), stream=True):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    stream_parser.feed(delta)
+            return "".join(parts)
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {e}")
+
+    async def _generate_with_openai_async(self, prompt: str, model: str = "gpt-4o") -> str:
+        """Generate response using the async OpenAI client"""
+        if not self.async_openai_client:
+            raise Exception("❌ Async OpenAI client not available")
+
+        try:
+            response = await self.async_openai_client.chat.completions.create(**self._openai_request(prompt, model))
             return response.choices[0].message.content
         except Exception as e:
             raise Exception(f"OpenAI API error: {e}")
 
+    async def _generate_ai_actions_async(self, market_data: Dict) -> List[Dict]:
+        """Async variant of generate_ai_actions - same prompt, validation and error handling"""
+        try:
+            prompt = self._build_ai_prompt(market_data)
+            response_text = await self._generate_with_openai_async(prompt, model="gpt-4o")
+            return self._parse_ai_actions(response_text, market_data)
+
+        except Exception as e:
+            print(f"❌ Error generating AI actions: {e}")
+            self._maybe_print_tb('generate_ai_actions_async', e)
+            return []
+
+    def generate_ai_actions_batch(self, market_data_list: List[Dict]) -> List[List[Dict]]:
+        """
+        Generate actions for several market snapshots with their OpenAI requests in flight concurrently,
+        so N prompts cost roughly one round-trip instead of N.
+        Returns one action list per snapshot, in input order.
+        """
+        if not self.async_openai_client:
+            return [self.generate_ai_actions(md) for md in market_data_list]
+
+        async def gather():
+            return await asyncio.gather(*(self._generate_ai_actions_async(md) for md in market_data_list))
+
+        # One long-lived loop - the async client's pooled connections are bound to it
+        if self._async_loop is None:
+            self._async_loop = asyncio.new_event_loop()
+        return self._async_loop.run_until_complete(gather())
+
+    def generate_ai_actions_future(self, market_data: Dict) -> Future:
+        """
+        Run generate_ai_actions on the I/O pool and return its Future right away,
+        so the caller can fetch data or submit other markets while the AI request is in flight
+        """
+        with self._state_lock:
+            if self._io_pool is None:
+                self._io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ai-io')
+            return self._io_pool.submit(self.generate_ai_actions, market_data)
+
+    def close(self):
+        """
+        Release the bot's background I/O resources - the AI worker pool, the batch event loop and the closed
+        positions journal. Called by run() on shutdown; each is created again on demand if the bot is used afterwards.
+        """
+        journal, self._journal, self._journal_writer = self._journal, None, None
+        if journal is not None:
+            journal.close()
+            atexit.unregister(journal.close)
+
+        with self._state_lock:
+            pool, self._io_pool = self._io_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)  # Queued prompts still finish; nothing new is accepted
+
+        loop, self._async_loop = self._async_loop, None
+        if loop is not None:
+            try:
+                if self.async_openai_client is not None:
+                    # Its pooled connections belong to this loop - close them on it, then start a fresh client
+                    loop.run_until_complete(self.async_openai_client.close())
+                    self.async_openai_client = openai.AsyncOpenAI(api_key=self.openai_api_key)
+            except Exception as e:
+                print(f"⚠️  Could not close async OpenAI client: {e}")
+            finally:
+                loop.close()
+
     def _print_pnl_report(self, market_data: Dict):
         """Print detailed PnL report for all positions"""
         pnl_data = self._calculate_pnl(market_data)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # One clock read for the header and the log rows
         
         print(f"\n{'='*60}")
-        print(f"📊 PnL Report - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"📊 PnL Report - {timestamp}")
         print(f"{'='*60}")
         print(f"Total Open Positions: {pnl_data['position_count']}")
         print(f"Total Unrealized PnL: ${pnl_data['total_pnl']:.4f}")
         print(f"Daily PnL (Realized + Unrealized): ${self.daily_pnl + pnl_data['total_pnl']:.4f}")
         
         if pnl_data['positions']:
-            print(f"\n📈 Position Details:")
+            print("\n📈 Position Details:")
             for i, pos in enumerate(pnl_data['positions'], 1):
                 pnl_indicator = "🟢" if pos['pnl_usd'] >= 0 else "🔴"
-                print(f"   {i}. {pos['market']} {pnl_indicator}")
-                print(f"      Entry: ${pos['entry_price']:.8f} | Current: ${pos['current_price']:.8f}")
-                print(f"      PnL: ${pos['pnl_usd']:.4f} ({pos['pnl_pct']:+.2f}%) | Size: ${pos['amount_usd']:.2f}")
+                print(_PNL_LINE_FMT.format(i, pos['market'], pnl_indicator, pos['entry_price'], pos['current_price'],
+                                           pos['pnl_usd'], pos['pnl_pct'], pos['amount_usd']))
         
         print(f"{'='*60}\n")
         
         # Log to Excel file
         try:
-            from logs import log_pnl_report, log_open_positions
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             log_pnl_report(pnl_data, self.daily_pnl, timestamp)
-            log_open_positions(self.open_positions, market_data, pnl_data)
-        except Exception as e:
-            print(f"⚠️  Could not log to Excel: {e}")
-        
-        # Log to Excel file
-        try:
-            from logs import log_pnl_report, log_open_positions
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            log_pnl_report(pnl_data, self.daily_pnl, timestamp)
-            log_open_positions(self.open_positions, market_data, pnl_data)
+            log_open_positions(_position_dicts(self.open_positions), market_data, pnl_data, timestamp)
         except Exception as e:
             print(f"⚠️  Could not log to Excel: {e}")
 
@@ -611,65 +946,112 @@ OUTPUT FORMAT (JSON only, no markdown):
             # In simulation, just return the address as-is (no checksum needed)
             return contract_address
 
-        symbol_upper = symbol.upper()
-        if symbol_upper == 'ETH':
-            symbol_upper = 'WETH'
-        return self.dex_config['tokens'].get(symbol_upper)
+        # Memoized per symbol as passed in, so repeat lookups skip the upper()
+        try:
+            return self._address_cache[symbol]
+        except KeyError:
+            address = self._address_cache[symbol] = self._tokens_uc.get(symbol.upper())
+            return address
 
     def _get_token_decimals(self, token_address: str) -> int:
-        """Get token decimals - default to 18 for simulation"""
-        # In simulation mode, we don't need actual decimals
-        # Most tokens use 18 decimals, USDC uses 6
-        if 'USDC' in str(token_address).upper():
-            return 6
-        return 18
-
-    def _find_contract_address(self, market_symbol: str, trade_data: Dict, liquidity_events: List) -> Optional[str]:
-        """Find contract address for a token symbol from trade data"""
-        contract_address = None
-        
-        # Try to find contract address from trade_data
+        """Get token decimals - default to 18 for simulation (cached, decimals never change per token)"""
+        decimals = self._decimals_cache.get(token_address)
+        if decimals is None:
+            # In simulation mode, we don't need actual decimals
+            # Most tokens use 18 decimals, USDC uses 6
+            decimals = 6 if 'USDC' in str(token_address).upper() else 18
+            self._decimals_cache[token_address] = decimals
+        return decimals
+
+    def _build_symbol_index(self, trade_data: Dict) -> Dict[str, Dict]:
+        """Map upper-cased symbol -> market entry from trade data (first occurrence wins)"""
+        return build_symbol_index(trade_data)
+
+    # Fallback prices for tokens without a market entry (exact-case symbols, as before)
+    _DEFAULT_PRICES = {'USDC': 1.0, 'DAI': 1.0, 'USDT': 1.0, 'WETH': 3000.0, 'ETH': 3000.0,
+                       'MATIC': 0.8}  # Approximate MATIC price (update as needed)
+
+    def _build_price_index(self, market_data: Dict) -> Dict[str, float]:
+        """
+        Map upper-cased symbol -> USD price from one pass over the markets
+        The first market with a positive price wins, matching the old per-call scan
+        """
+        # Handle new format with trade_data
+        trade_data = market_data.get('trade_data', {})
         markets = trade_data.get('top_markets', []) if trade_data else []
-        for m in markets:
-            if m.get('symbol', '').upper() == market_symbol:
-                contract_address = m.get('contract_address', '')
-                break
-        
-        # Note: liquidity_events now contains OrdersMatched events with asset IDs, not contract addresses
-        # Contract addresses are found from trade_data only
-        
-        return contract_address
+
+        # Fallback to old format for compatibility
+        if not markets and market_data.get('top_markets'):
+            markets = market_data['top_markets']
+
+        index = {}
+        for market in markets:
+            price = market.get('recent_price', 0)
+            if price and price > 0:
+                index.setdefault(market['symbol'].upper(), float(price))
+        return index
+
+    def _price_index_for(self, market_data: Optional[Dict]) -> Dict[str, float]:
+        """
+        This tick's symbol -> price index - built on first use, then served from _price_cache by id(market_data)
+        so the close, PnL and status paths of one cycle share a single pass over the markets
+        """
+        if not market_data:
+            return {}
+        return self._tick_index(self._price_cache, market_data, self._build_price_index)
+
+    def _symbol_index_for(self, market_data: Optional[Dict]) -> Dict[str, Dict]:
+        """
+        This tick's upper-cased symbol -> market entry index, cached like _price_index_for
+        so action parsing and trade execution share a single pass over top_markets
+        """
+        if not market_data:
+            return {}
+        return self._tick_index(self._symbol_cache, market_data,
+                                lambda md: self._build_symbol_index(md.get('trade_data') or {}))
+
+    def _tick_index(self, cache: Dict[int, Tuple[Dict, Any]], market_data: Dict, build) -> Any:
+        """
+        Serve an index of market_data from cache by id(market_data), building it on first use
+
+        Args:
+            cache: Per-cycle cache of id(market_data) -> (market_data, index)
+            market_data: This tick's market data
+            build: Callable building the index from market_data
+
+        Returns:
+            The cached or freshly built index
+        """
+        entry = cache.get(id(market_data))
+        # The entry holds market_data itself: an id can only be reused after the object is gone
+        if entry is not None and entry[0] is market_data:
+            return entry[1]
+        index = build(market_data)
+        with self._state_lock:  # Action parsing may run on the AI worker threads
+            if len(cache) >= 8:
+                cache.clear()  # Callers outside run() never hit the per-cycle reset
+            cache[id(market_data)] = (market_data, index)
+        return index
 
     def _get_token_price_usd(self, token_symbol: str, market_data: Optional[Dict] = None) -> float:
         """Get token price in USD from market data"""
-        if market_data:
-            # Handle new format with trade_data
-            trade_data = market_data.get('trade_data', {})
-            markets = trade_data.get('top_markets', []) if trade_data else []
-            
-            # Fallback to old format for compatibility
-            if not markets and market_data.get('top_markets'):
-                markets = market_data['top_markets']
-            
-            for market in markets:
-                if market['symbol'].upper() == token_symbol.upper():
-                    price = market.get('recent_price', 0)
-                    if price and price > 0:
-                        return float(price)
-
-        if token_symbol in ['USDC', 'DAI', 'USDT']:
-            return 1.0
-        if token_symbol in ['WETH', 'ETH']:
-            return 3000.0
-        if token_symbol == 'MATIC':
-            return 0.8  # Approximate MATIC price (update as needed)
-        return 1.0
+        price = self._price_index_for(market_data).get(token_symbol.upper())
+        if price:
+            return price
+
+        return self._DEFAULT_PRICES.get(token_symbol, 1.0)
+
+    def _get_token_prices_usd(self, token_symbols: List[str], market_data: Optional[Dict] = None) -> List[float]:
+        """_get_token_price_usd for many symbols at once - the index is resolved once for the whole batch"""
+        index_get = self._price_index_for(market_data).get
+        default_get = self._DEFAULT_PRICES.get
+        return [index_get(symbol.upper()) or default_get(symbol, 1.0) for symbol in token_symbols]
 
     def _find_input_token(self, target_token_address: str, market_data: Optional[Dict] = None) -> Optional[Dict]:
         """Find which token to trade from - simplified for simulation"""
         # In simulation mode, always use USDC as input token
         token_symbol = 'USDC'
-        token_address = self.dex_config['tokens'].get(token_symbol)
+        token_address = self._tokens_uc.get(token_symbol)
         
         if not token_address:
             return None
@@ -685,27 +1067,43 @@ OUTPUT FORMAT (JSON only, no markdown):
 
     def _calculate_pnl(self, market_data: Dict) -> Dict:
         """Calculate PnL for all open positions"""
-        total_pnl = 0.0
-        position_pnls = []
-        
-        for position in self.open_positions:
-            token_symbol = position['token_out']
-            current_price = self._get_token_price_usd(token_symbol, market_data)
-            
-            if current_price and current_price > 0:
-                pnl_pct = ((current_price - position['entry_price']) / position['entry_price']) * 100
-                pnl_usd = (current_price - position['entry_price']) / position['entry_price'] * position['amount_usd']
-                total_pnl += pnl_usd
-                
-                position_pnls.append({
-                    'market': token_symbol,
-                    'entry_price': position['entry_price'],
-                    'current_price': current_price,
-                    'pnl_usd': pnl_usd,
-                    'pnl_pct': pnl_pct,
-                    'amount_usd': position['amount_usd']
-                })
-        
+        # All current prices resolved in one batch, then positions without a usable price dropped - as are those
+        # with a non-positive entry price (taken straight from the AI signal), which have no defined PnL ratio
+        prices = self._get_token_prices_usd([p.token_out for p in self.open_positions], market_data)
+        priced = [(position, price) for position, price in zip(self.open_positions, prices)
+                  if price and price > 0 and position.entry_price > 0]
+
+        # Numeric core runs over parallel arrays - compiled kernel, else NumPy ufuncs, else the plain loop
+        entry = [p.entry_price for p, _ in priced]
+        amount = [p.amount_usd for p, _ in priced]
+        current = [c for _, c in priced]
+        if NUMPY_AVAILABLE:
+            entry, amount, current = (np.asarray(a, dtype=np.float64) for a in (entry, amount, current))
+            if NUMBA_AVAILABLE:
+                out_usd, out_pct = np.empty(len(priced)), np.empty(len(priced))
+                total_pnl = float(_pnl_kernel(entry, amount, current, out_usd, out_pct))
+            else:
+                ratio = (current - entry) / entry
+                out_pct, out_usd = ratio * 100, ratio * amount
+                total_pnl = float(out_usd.sum())
+            # Per-position dicts are for display only, built after the math
+            out_usd, out_pct = out_usd.tolist(), out_pct.tolist()
+        else:
+            out_usd, out_pct = [0.0] * len(priced), [0.0] * len(priced)
+            total_pnl = float(_pnl_kernel(entry, amount, current, out_usd, out_pct))
+
+        position_pnls = [
+            {
+                'market': position.token_out,
+                'entry_price': position.entry_price,
+                'current_price': current_price,
+                'pnl_usd': pnl_usd,
+                'pnl_pct': pnl_pct,
+                'amount_usd': position.amount_usd
+            }
+            for (position, current_price), pnl_usd, pnl_pct in zip(priced, out_usd, out_pct)
+        ]
+
         return {
             'total_pnl': total_pnl,
             'position_count': len(position_pnls),
@@ -717,22 +1115,15 @@ OUTPUT FORMAT (JSON only, no markdown):
         market_symbol = signal['market'].upper()
         
         # Find the open position
-        position = None
-        for pos in self.open_positions:
-            if pos['token_out'].upper() == market_symbol:
-                position = pos
-                break
+        position = self._positions_by_symbol.get(market_symbol)
         
         if not position:
             print(f"   ❌ No open position found for {market_symbol}")
             return None
         
         print(f"\n🤖 AI Signal: CLOSE {signal['market']}")
-        print(f"   Confidence: {signal['confidence']}%")
-        print(f"   Reasoning: {signal.get('reasoning', 'N/A')[:100]}...")
-        print(f"   Entry: ${position['entry_price']:.8f}")
-        print(f"   Target: ${position['target_price']:.8f}")
-        print(f"   Stop Loss: ${position['stop_loss']:.8f}")
+        print(_SIGNAL_FMT.format(signal['confidence'], signal.get('reasoning', 'N/A')[:100]))
+        print(_LEVELS_FMT.format(position.entry_price, position.target_price, position.stop_loss))
         
         # Get current price
         current_price = self._get_token_price_usd(market_symbol, market_data)
@@ -742,35 +1133,27 @@ OUTPUT FORMAT (JSON only, no markdown):
         
         print(f"   Current: ${current_price:.8f}")
         
-        # Close the position
-        close_success = self._close_position(position, market_data, current_price)
+        # Close the position - PnL comes back from the close itself
+        close_success, pnl_usd, pnl_pct = self._close_position(position, market_data, current_price)
         
         if close_success:
-            # Calculate PnL
-            pnl_pct = ((current_price - position['entry_price']) / position['entry_price']) * 100
-            pnl_usd = (current_price - position['entry_price']) / position['entry_price'] * position['amount_usd']
             self.daily_pnl += pnl_usd
+            self.total_realized_pnl += pnl_usd
             
             # Update position with close info
-            position['close_price'] = current_price
-            position['close_reason'] = signal.get('reasoning', 'AI decision')
-            position['pnl_usd'] = pnl_usd
-            position['pnl_pct'] = pnl_pct
-            position['closed_at'] = datetime.now().isoformat()
+            position.close_price = current_price
+            position.close_reason = signal.get('reasoning', 'AI decision')
+            position.pnl_usd = pnl_usd
+            position.pnl_pct = pnl_pct
+            position.closed_at = datetime.now().isoformat()  # True close time, not the cycle's
             
             # Move to closed positions
-            self.open_positions.remove(position)
+            self._remove_open_position(position)
             self.closed_positions.append(position)
             
-            print(f"   ✅ Position closed")
-            print(f"   💰 PnL: ${pnl_usd:.4f} ({pnl_pct:+.2f}%)")
+            print("   ✅ Position closed")
             
-            # Log closed position to Excel
-            try:
-                from logs import log_closed_positions
-                log_closed_positions([position])
-            except Exception as e:
-                print(f"⚠️  Could not log closed position to Excel: {e}")
+            self._journal_close(position)
             
             return "closed"
         
@@ -784,39 +1167,24 @@ OUTPUT FORMAT (JSON only, no markdown):
         action = action_data.get('action', '').upper()
         
         print(f"\n🤖 AI Action: {action} {action_data.get('market', 'N/A')}")
-        print(f"   Confidence: {action_data.get('confidence', 0)}%")
-        print(f"   Reasoning: {action_data.get('reasoning', 'N/A')[:100]}...")
+        print(_SIGNAL_FMT.format(action_data.get('confidence', 0), action_data.get('reasoning', 'N/A')[:100]))
         
-        # Route to appropriate handler
-        if action == 'CLOSE':
-            return self._execute_close(action_data, market_data)
-        elif action == 'HOLD':
-            return self._execute_hold(action_data, market_data)
-        elif action == 'PARTIAL_CLOSE':
-            return self._execute_partial_close(action_data, market_data)
-        elif action == 'BUY':
-            return self._execute_buy(action_data, market_data)
-        elif action == 'SELL':
-            return self._execute_sell(action_data, market_data)
-        elif action == 'MARKET_MAKE':
-            return self._execute_market_make(action_data, market_data)
-        elif action == 'ADJUST_STOP_LOSS':
-            return self._execute_adjust_stop_loss(action_data, market_data)
-        elif action == 'ADJUST_TARGET':
-            return self._execute_adjust_target(action_data, market_data)
-        else:
+        # Route to appropriate handler - one dict lookup
+        handler = self._handlers.get(action)
+        if handler is None:
             print(f"   ❌ Unknown action type: {action}")
             return None
+        return handler(action_data, market_data)
 
     def _execute_hold(self, action_data: Dict, market_data: Dict) -> Optional[str]:
         """Execute HOLD action - explicitly keep position open"""
         market_symbol = action_data['market'].upper()
-        position = next((p for p in self.open_positions if p['token_out'].upper() == market_symbol), None)
+        position = self._positions_by_symbol.get(market_symbol)
         
         if position:
             current_price = self._get_token_price_usd(market_symbol, market_data)
             print(f"   ✅ Holding position: {market_symbol}")
-            print(f"   Entry: ${position['entry_price']:.8f}, Current: ${current_price:.8f}")
+            print(f"   Entry: ${position.entry_price:.8f}, Current: ${current_price:.8f}")
             return "held"
         else:
             print(f"   ⚠️  No position to hold for {market_symbol}")
@@ -825,7 +1193,7 @@ OUTPUT FORMAT (JSON only, no markdown):
     def _execute_partial_close(self, action_data: Dict, market_data: Dict) -> Optional[str]:
         """Execute PARTIAL_CLOSE action - close part of a position"""
         # TODO: Implement partial close logic
-        print(f"   ⚠️  PARTIAL_CLOSE not yet implemented, closing full position instead")
+        print("   ⚠️  PARTIAL_CLOSE not yet implemented, closing full position instead")
         return self._execute_close(action_data, market_data)
 
     def _execute_buy(self, action_data: Dict, market_data: Dict) -> Optional[str]:
@@ -835,24 +1203,24 @@ OUTPUT FORMAT (JSON only, no markdown):
     def _execute_sell(self, action_data: Dict, market_data: Dict) -> Optional[str]:
         """Execute SELL action - open a short position (if supported)"""
         # For now, treat SELL as closing a position or swapping to stablecoin
-        print(f"   ⚠️  SELL action - treating as swap to stablecoin")
+        print("   ⚠️  SELL action - treating as swap to stablecoin")
         return self._execute_trade(action_data, market_data, 'SELL')
 
     def _execute_market_make(self, action_data: Dict, market_data: Dict) -> Optional[str]:
         """Execute MARKET_MAKE action - provide liquidity"""
         # TODO: Implement market making logic (Uniswap V3 range orders)
-        print(f"   ⚠️  MARKET_MAKE not yet implemented")
+        print("   ⚠️  MARKET_MAKE not yet implemented")
         return None
 
     def _execute_adjust_stop_loss(self, action_data: Dict, market_data: Dict) -> Optional[str]:
         """Execute ADJUST_STOP_LOSS action - modify stop loss"""
         market_symbol = action_data['market'].upper()
-        position = next((p for p in self.open_positions if p['token_out'].upper() == market_symbol), None)
+        position = self._positions_by_symbol.get(market_symbol)
         
         if position:
             new_stop_loss = action_data.get('new_value')
-            old_stop_loss = position['stop_loss']
-            position['stop_loss'] = new_stop_loss
+            old_stop_loss = position.stop_loss
+            position.stop_loss = new_stop_loss
             print(f"   ✅ Adjusted stop loss for {market_symbol}: ${old_stop_loss:.8f} → ${new_stop_loss:.8f}")
             return "adjusted"
         else:
@@ -862,12 +1230,12 @@ OUTPUT FORMAT (JSON only, no markdown):
     def _execute_adjust_target(self, action_data: Dict, market_data: Dict) -> Optional[str]:
         """Execute ADJUST_TARGET action - modify target price"""
         market_symbol = action_data['market'].upper()
-        position = next((p for p in self.open_positions if p['token_out'].upper() == market_symbol), None)
+        position = self._positions_by_symbol.get(market_symbol)
         
         if position:
             new_target = action_data.get('new_value')
-            old_target = position['target_price']
-            position['target_price'] = new_target
+            old_target = position.target_price
+            position.target_price = new_target
             print(f"   ✅ Adjusted target for {market_symbol}: ${old_target:.8f} → ${new_target:.8f}")
             return "adjusted"
         else:
@@ -880,9 +1248,7 @@ OUTPUT FORMAT (JSON only, no markdown):
 
     def _execute_trade(self, action_data: Dict, market_data: Dict, trade_type: str) -> Optional[str]:
         """Simulate a BUY or SELL trade - records position without executing blockchain transaction"""
-        print(f"   Entry: ${action_data['entry_price']:.8f}")
-        print(f"   Target: ${action_data['target_price']:.8f}")
-        print(f"   Stop Loss: ${action_data['stop_loss']:.8f}")
+        print(_LEVELS_FMT.format(action_data['entry_price'], action_data['target_price'], action_data['stop_loss']))
         
         # Use custom amount if specified, otherwise use default
         position_size = action_data.get('amount_usd', self.max_position_size)
@@ -906,71 +1272,176 @@ OUTPUT FORMAT (JSON only, no markdown):
             print(f"   📊 Entry Price: ${entry_price:.8f}")
             print(f"   📊 Current Market Price: ${current_price:.8f}")
 
-            # Extract asset_id from market_data
-            asset_id = None
-            trade_data = market_data.get('trade_data', {}) if market_data else {}
-            markets = trade_data.get('top_markets', []) if trade_data else []
-            for m in markets:
-                if m.get('symbol', '').upper() == action_data['market'].upper():
-                    asset_id = m.get('asset_id')
-                    break
+            # Extract asset_id from this tick's symbol index
+            market_entry = self._symbol_index_for(market_data).get(action_data['market'].upper())
+            asset_id = market_entry.get('asset_id') if market_entry else None
             
             # Record position (simulated)
             position_id = f"sim_{int(time.time())}_{action_data['market']}"
-            position = {
-                'id': position_id,
-                'market': action_data['market'],
-                'action': action_data['action'],
-                'entry_price': entry_price,
-                'target_price': action_data['target_price'],
-                'stop_loss': action_data['stop_loss'],
-                'confidence': action_data['confidence'],
-                'reasoning': action_data.get('reasoning', ''),
-                'timestamp': datetime.now().isoformat(),
-                'amount_usd': position_size,
-                'token_out': action_data['market'],
-                'contract_address': action_data.get('contract_address', ''),
-                'asset_id': asset_id,  # Store asset ID for tracking
-                'simulated': True  # Mark as simulated
-            }
+            position = Position(
+                id=position_id,
+                market=action_data['market'],
+                action=action_data['action'],
+                entry_price=entry_price,
+                target_price=action_data['target_price'],
+                stop_loss=action_data['stop_loss'],
+                confidence=action_data['confidence'],
+                reasoning=action_data.get('reasoning', ''),
+                timestamp=self._timestamp_iso(),
+                amount_usd=position_size,
+                token_out=action_data['market'],
+                contract_address=action_data.get('contract_address', ''),
+                asset_id=asset_id,  # Store asset ID for tracking
+                simulated=True  # Mark as simulated
+            )
 
-            self.open_positions.append(position)
-            print(f"   ✅ Position recorded (SIMULATED)")
+            self._add_open_position(position)
+            print("   ✅ Position recorded (SIMULATED)")
             print(f"   📝 Position ID: {position_id}")
             return position_id
 
         except Exception as e:
             print(f"   ❌ Error simulating trade: {e}")
-            import traceback
-            traceback.print_exc()
+            self._maybe_print_tb('execute_trade', e)
             return None
 
-    def _close_position(self, position: Dict, market_data: Dict, current_price: float) -> bool:
-        """Simulate closing a position - records exit price without executing blockchain transaction"""
+    def _add_open_position(self, position: Position):
+        """Record a new open position, keeping the symbol index and open total in step"""
+        self.open_positions.append(position)
+        self._positions_by_symbol.setdefault(position.symbol_key, position)  # Earlier position keeps the slot
+        self._open_amount_total += position.amount_usd
+        self._position_changes += 1
+
+    def _remove_open_position(self, position: Position):
+        """Drop a position from the open set, keeping the symbol index and open total in step"""
+        self.open_positions.remove(position)
+        self._position_changes += 1
+        key = position.symbol_key
+        if self._positions_by_symbol.get(key) is position:
+            # Hand the slot to the next open position with the same symbol, if any
+            successor = next((p for p in self.open_positions if p.symbol_key == key), None)
+            if successor is None:
+                del self._positions_by_symbol[key]
+            else:
+                self._positions_by_symbol[key] = successor
+        # Reset once flat so float error from many add/subtract steps can't build up
+        self._open_amount_total = self._open_amount_total - position.amount_usd if self.open_positions else 0.0
+
+    def _close_position(self, position: Position, market_data: Dict, current_price: float) -> Tuple[bool, float, float]:
+        """
+        Simulate closing a position - records exit price without executing blockchain transaction
+
+        Returns:
+            Tuple of (success, pnl_usd, pnl_pct) - PnL is 0.0 when the close failed
+        """
         try:
-            token_symbol = position['token_out']
+            token_symbol = position.token_out
             
             print(f"   💱 Simulating close of {token_symbol} position")
-            print(f"   📊 Entry Price: ${position['entry_price']:.8f}")
+            print(f"   📊 Entry Price: ${position.entry_price:.8f}")
             print(f"   📊 Exit Price: ${current_price:.8f}")
             
-            # Calculate PnL
-            pnl_pct = ((current_price - position['entry_price']) / position['entry_price']) * 100
-            pnl_usd = (current_price - position['entry_price']) / position['entry_price'] * position['amount_usd']
+            # Calculate PnL - one divide, shared by both figures (same expression as _pnl_kernel)
+            entry = position.entry_price
+            ratio = (current_price - entry) / entry
+            pnl_pct = ratio * 100
+            pnl_usd = ratio * position.amount_usd
             
-            print(f"   ✅ Position closed (SIMULATED)")
+            print("   ✅ Position closed (SIMULATED)")
             print(f"   💰 PnL: ${pnl_usd:.4f} ({pnl_pct:+.2f}%)")
             
-            return True
+            return True, pnl_usd, pnl_pct
                 
         except Exception as e:
             print(f"   ❌ Error closing position: {e}")
-            import traceback
+            self._maybe_print_tb('close_position', e)
+            return False, 0.0, 0.0
+
+    # Position fields written per close to the CSV journal, in column order
+    _JOURNAL_FIELDS = ('closed_at', 'id', 'market', 'asset_id', 'action', 'entry_price', 'close_price',
+                       'amount_usd', 'pnl_usd', 'pnl_pct', 'close_reason')
+
+    def _open_closed_journal(self):
+        """
+        Open logs/closed_positions_journal.csv for appending (header written if the file is new)
+
+        Returns:
+            Tuple of (file, csv writer), or (None, None) if it can't be opened
+        """
+        try:
+            journal = open(get_logs_directory() / 'closed_positions_journal.csv', 'a',
+                           buffering=1, newline='', encoding='utf-8')
+        except OSError as e:
+            print(f"⚠️  Could not open closed positions journal: {e}")
+            return None, None
+        atexit.register(journal.close)  # Closed at exit if close() never runs (bot used without run())
+        writer = csv.writer(journal)
+        if journal.tell() == 0:
+            writer.writerow(self._JOURNAL_FIELDS)
+        return journal, writer
+
+    def _journal_close(self, position: Position):
+        """Append one closed position to the CSV journal (opened here on first use)"""
+        if self._journal_writer is None:
+            self._journal, self._journal_writer = self._open_closed_journal()
+            if self._journal_writer is None:
+                return
+        try:
+            self._journal_writer.writerow([getattr(position, name) for name in self._JOURNAL_FIELDS])
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not write closed position to journal: {e}")
+
+    # Actions that open a new position - gated by the safety limits
+    _OPENING_ACTIONS = frozenset(('BUY', 'SELL', 'MARKET_MAKE'))
+
+    # Actions that only edit local position state (no transaction) - exempt from the action throttle
+    _UNTHROTTLED_ACTIONS = frozenset(('HOLD', 'ADJUST_STOP_LOSS', 'ADJUST_TARGET'))
+
+    def _rate_limit(self, min_gap: float = 2.0):
+        """Sleep only for whatever is left of min_gap since the last throttled action (not a fixed delay after each)"""
+        now = time.monotonic()
+        wait = min_gap - (now - self._last_action_ts)
+        if wait > 0:
+            sys.stdout.flush()  # Show what ran so far before pausing
+            time.sleep(wait)
+            now += wait
+        self._last_action_ts = now
+
+    def _maybe_print_tb(self, site: str, exc: BaseException, min_gap: float = 60.0):
+        """
+        Print the current exception's traceback at most once per min_gap seconds for each call site + exception class
+        A failure that repeats every cycle keeps its one-line error message, without a full traceback each time.
+        """
+        key = f"{site}:{type(exc).__name__}"
+        now = time.monotonic()
+        if now - self._last_tb.get(key, float('-inf')) > min_gap:
+            self._last_tb[key] = now
+            sys.stdout.flush()  # Keep the preceding output ahead of the traceback on stderr
             traceback.print_exc()
-            return False
 
     def run(self, interval: int = 60):
         """Main trading loop with enhanced AI - SIMULATION MODE"""
+        self._stop.clear()  # A stop() or Ctrl-C that ended an earlier run() mustn't end this one
+        # Cycle output is collected and written in a few large chunks (before each blocking wait)
+        # instead of one stdout write per print line
+        out = _BufferedStdout(sys.stdout)
+        # Log handlers writing to the real stdout (main.py's basicConfig) go through the buffer too,
+        # so warnings stay in order with the prints around them - each record flushes what came before it
+        handlers = [h for h in logging.root.handlers
+                    if isinstance(h, logging.StreamHandler) and h.stream is sys.stdout]
+        for handler in handlers:
+            handler.setStream(out)
+        try:
+            with contextlib.redirect_stdout(out):
+                self._run_cycles(interval)
+        finally:
+            self._cycle_ts = self._cycle_iso = None  # Calls made after run() get their own timestamps
+            for handler in handlers:
+                handler.setStream(out._stream)
+            out.flush()
+
+    def _run_cycles(self, interval: int):
+        """Body of run() - prints go to the cycle buffer, flushed wherever the loop is about to block"""
         print(f"\n🚀 Starting AI Trading Bot V2 - SIMULATION MODE (interval: {interval}s)")
         print("=" * 60)
         print("⚠️  SIMULATION MODE: No actual transactions will be executed")
@@ -984,40 +1455,52 @@ OUTPUT FORMAT (JSON only, no markdown):
             while True:
                 try:
                     cycle += 1
+                    self._cycle_ts = datetime.now()
+                    self._cycle_iso = self._cycle_ts.isoformat()
+                    self._price_cache.clear()  # Last cycle's market data is stale - drop its indexes
+                    self._symbol_cache.clear()
                     print(f"\n{'='*60}")
-                    print(f"📊 Cycle {cycle} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+                    print(f"📊 Cycle {cycle} - {self._cycle_ts.strftime('%Y-%m-%d %H:%M:%S')}")
                     print(f"{'='*60}")
+                    sys.stdout.flush()
 
                     # Fetch ENHANCED market data
                     market_data = get_enhanced_market_data()
 
                     if not market_data:
                         print("⚠️  No market data, skipping cycle")
-                        time.sleep(interval)
+                        sys.stdout.flush()
+                        if self._stop.wait(interval):
+                            break
                         continue
 
                     # Generate AI actions - AI decides ALL actions (open, close, hold, etc.)
                     print("\n🤖 Asking AI to analyze markets and decide actions...")
+                    sys.stdout.flush()
                     actions = self.generate_ai_actions(market_data)
 
                     if actions:
                         print(f"\n✨ AI generated {len(actions)} action(s)")
                         for action in actions:
-                            # Only check safety limits for opening new positions
-                            if action.get('action', '').upper() in ['BUY', 'SELL', 'MARKET_MAKE']:
+                            action_type = action.get('action', '').upper()
+                            # Only check safety limits for opening new positions (the verdict is reused
+                            # until a position opens or closes, so a batch of BUYs costs one evaluation)
+                            if action_type in self._OPENING_ACTIONS:
                                 if not self._check_safety_limits():
                                     print(f"   ⚠️  Safety limits reached, skipping {action.get('action')} action")
                                     continue
+                            # Only actions that would hit the chain are spaced out - pure state changes run back to back
+                            if action_type not in self._UNTHROTTLED_ACTIONS:
+                                self._rate_limit()
                             self.execute_action(action, market_data)
-                            time.sleep(2)
                     else:
                         print("⏸️  AI decided to wait (no actions needed)")
 
                     # Status
-                    print(f"\n📈 Portfolio Status:")
+                    print("\n📈 Portfolio Status:")
                     print(f"   Open Positions: {len(self.open_positions)}/{self.max_open_positions}")
                     print(f"   Daily PnL (Realized): ${self.daily_pnl:.4f}")
-                    print(f"   AI Success Rate: {len([s for s in self.signal_history[-20:] if s.get('outcome')=='success'])/max(len(self.signal_history[-20:]), 1)*100:.1f}%")
+                    print(f"   AI Success Rate: {self._status_success.mean * 100:.1f}%")
 
                     # Calculate and print PnL every 5 minutes
                     current_time = time.time()
@@ -1025,45 +1508,67 @@ OUTPUT FORMAT (JSON only, no markdown):
                         self._print_pnl_report(market_data)
                         last_pnl_time = current_time
 
-                    # Wait
-                    time.sleep(interval)
+                    # Save everything logged this cycle - one write per workbook
+                    try:
+                        flush_logs()
+                    except Exception as e:
+                        print(f"⚠️  Could not save Excel logs: {e}")
+
+                    # Wait - returns early (and ends the loop) as soon as stop() is called
+                    sys.stdout.flush()
+                    if self._stop.wait(interval):
+                        break
 
                 except KeyboardInterrupt:
                     raise  # Re-raise to handle in outer try-except
                 except Exception as e:
                     print(f"❌ Error: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    time.sleep(10)
+                    self._maybe_print_tb('run', e)
+                    sys.stdout.flush()
+                    if self._stop.wait(10):
+                        break
 
         except KeyboardInterrupt:
-            print("\n🛑 Shutting down...")
-            # Calculate final PnL on exit
-            print("\n📊 Calculating final PnL...")
-            market_data = get_enhanced_market_data()
-            if market_data:
-                self._print_pnl_report(market_data)
-            
-            # Print summary of closed positions
-            if self.closed_positions:
-                print(f"\n📋 Closed Positions Summary:")
-                print(f"   Total Closed: {len(self.closed_positions)}")
-                total_realized_pnl = sum(p.get('pnl_usd', 0) for p in self.closed_positions)
-                print(f"   Total Realized PnL: ${total_realized_pnl:.4f}")
-            
-            # Log final summary to Excel
-            try:
-                from logs import log_trading_summary, log_closed_positions, log_signal_history
-                pnl_data = self._calculate_pnl(market_data) if market_data else None
-                log_trading_summary(self.open_positions, self.closed_positions, self.daily_pnl, pnl_data)
-                log_closed_positions(self.closed_positions)
-                if self.signal_history:
-                    log_signal_history(self.signal_history)
-                print(f"\n📝 Trading data logged to Excel files in 'logs/' directory")
-            except Exception as e:
-                print(f"⚠️  Could not log final summary to Excel: {e}")
-            
-            print("\n✅ Simulation ended")
+            self._stop.set()
+        self._shutdown()
+
+    def stop(self):
+        """Ask run() to shut down - it wakes from its wait between cycles immediately instead of sleeping it out"""
+        self._stop.set()
+
+    def _shutdown(self):
+        """Final PnL report, summary and bulk logs - run() ends with this, whether stopped by stop() or Ctrl-C"""
+        print("\n🛑 Shutting down...")
+        # Calculate final PnL on exit
+        print("\n📊 Calculating final PnL...")
+        sys.stdout.flush()
+        market_data = get_enhanced_market_data()
+        if market_data:
+            self._print_pnl_report(market_data)
+        
+        # Print summary of closed positions
+        if self.closed_positions:
+            print("\n📋 Closed Positions Summary:")
+            print(f"   Total Closed: {len(self.closed_positions)}")
+            print(f"   Total Realized PnL: ${self.total_realized_pnl:.4f}")
+        
+        # Log final summary to Excel - log_trading_summary also writes the open and closed positions logs
+        try:
+            pnl_data = self._calculate_pnl(market_data) if market_data else None
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            log_trading_summary(_position_dicts(self.open_positions), _position_dicts(self.closed_positions),
+                                self.daily_pnl, pnl_data, timestamp)
+            with self._state_lock:
+                signals = list(self.signal_history)  # Snapshot - a queued AI request may still be recording
+            if signals:
+                log_signal_history(signals, timestamp)
+            flush_logs()
+            print("\n📝 Trading data logged to Excel files in 'logs/' directory")
+        except Exception as e:
+            print(f"⚠️  Could not log final summary to Excel: {e}")
+        
+        self.close()
+        print("\n✅ Simulation ended")
 
 
 if __name__ == "__main__":
@@ -1075,7 +1580,6 @@ if __name__ == "__main__":
     print("   • Trade simulation (records buy/sell prices)")
     print("   • PnL calculation every 5 minutes")
     print("   • Liquidity flow analysis (smart money tracking)")
-    print("   • Liquidity flow analysis (smart money tracking)")
     print("   • Enhanced AI prompting (better context)")
     print("   • Performance tracking (AI learns from results)")
     print("=" * 60)